@@ -0,0 +1,55 @@
+"""Add role inheritance with a transitive closure table
+
+Revision ID: add_role_inheritance
+Revises: partition_sessions_by_created_at
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_role_inheritance'
+down_revision = 'partition_sessions_by_created_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'role_parent',
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['parent_id'], ['roles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('role_id', 'parent_id')
+    )
+    op.create_table(
+        'role_closure',
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('inherited_role_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(
+            ['inherited_role_id'], ['roles.id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('role_id', 'inherited_role_id')
+    )
+    op.create_index(
+        op.f('ix_role_closure_inherited_role_id'),
+        'role_closure',
+        ['inherited_role_id'],
+        unique=False,
+    )
+    # Every existing role inherits only itself
+    op.execute(
+        "INSERT INTO role_closure (role_id, inherited_role_id) "
+        "SELECT id, id FROM roles"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f('ix_role_closure_inherited_role_id'), table_name='role_closure'
+    )
+    op.drop_table('role_closure')
+    op.drop_table('role_parent')
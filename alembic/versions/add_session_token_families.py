@@ -0,0 +1,26 @@
+"""Add refresh token families to sessions
+
+Revision ID: add_session_token_families
+Revises: add_integrations_table
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_session_token_families'
+down_revision = 'add_integrations_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing sessions get a family on their next rotation
+    op.add_column('sessions', sa.Column('family_id', sa.String(), nullable=True))
+    op.create_index(op.f('ix_sessions_family_id'), 'sessions', ['family_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sessions_family_id'), table_name='sessions')
+    op.drop_column('sessions', 'family_id')
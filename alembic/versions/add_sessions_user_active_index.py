@@ -0,0 +1,27 @@
+"""Add composite index for per-user active sessions
+
+Revision ID: add_sessions_user_active_index
+Revises: add_session_token_families
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_sessions_user_active_index'
+down_revision = 'add_session_token_families'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_sessions_user_active',
+        'sessions',
+        ['user_id', 'is_active', 'expires_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_user_active', table_name='sessions')
@@ -0,0 +1,52 @@
+"""Store integration API keys as a prefix and a hash
+
+Revision ID: hash_integration_api_keys
+Revises: add_role_inheritance
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'hash_integration_api_keys'
+down_revision = 'add_role_inheritance'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('integrations', sa.Column('api_key_prefix', sa.String(), nullable=True))
+    op.add_column('integrations', sa.Column('api_key_hash', sa.String(), nullable=True))
+    # Existing keys keep working: they are found by their first 8 characters
+    op.execute("""
+        UPDATE integrations
+        SET api_key_prefix = left(api_key, 8),
+            api_key_hash = encode(sha256(convert_to(api_key, 'UTF8')), 'hex')
+    """)
+    op.alter_column('integrations', 'api_key_prefix', nullable=False)
+    op.alter_column('integrations', 'api_key_hash', nullable=False)
+    op.create_index(
+        op.f('ix_integrations_api_key_prefix'),
+        'integrations',
+        ['api_key_prefix'],
+        unique=True,
+    )
+    op.drop_index(op.f('ix_integrations_api_key'), table_name='integrations')
+    op.drop_column('integrations', 'api_key')
+
+
+def downgrade() -> None:
+    # Plain keys cannot be recovered from their hashes; integrations need
+    # new keys after a downgrade
+    op.add_column('integrations', sa.Column('api_key', sa.String(), nullable=True))
+    op.execute("UPDATE integrations SET api_key = api_key_prefix || '.revoked'")
+    op.alter_column('integrations', 'api_key', nullable=False)
+    op.create_index(
+        op.f('ix_integrations_api_key'), 'integrations', ['api_key'], unique=True
+    )
+    op.drop_index(
+        op.f('ix_integrations_api_key_prefix'), table_name='integrations'
+    )
+    op.drop_column('integrations', 'api_key_hash')
+    op.drop_column('integrations', 'api_key_prefix')
@@ -0,0 +1,131 @@
+"""Range-partition sessions by created_at
+
+Revision ID: partition_sessions_by_created_at
+Revises: add_sessions_user_active_index
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'partition_sessions_by_created_at'
+down_revision = 'add_sessions_user_active_index'
+branch_labels = None
+depends_on = None
+
+SESSION_INDEXES = """
+    CREATE INDEX ix_sessions_id ON sessions (id);
+    CREATE INDEX ix_sessions_refresh_token ON sessions (refresh_token);
+    CREATE INDEX ix_sessions_family_id ON sessions (family_id);
+    CREATE INDEX ix_sessions_user_active ON sessions (user_id, is_active, expires_at);
+"""
+
+# Months created ahead of the current one; partition maintenance takes
+# over from there
+PREMAKE_MONTHS = 3
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month_index = value.year * 12 + value.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        return
+
+    op.execute("UPDATE sessions SET created_at = now() WHERE created_at IS NULL")
+    op.execute("ALTER TABLE sessions RENAME TO sessions_legacy")
+    op.execute("ALTER INDEX sessions_pkey RENAME TO sessions_legacy_pkey")
+    op.execute("ALTER SEQUENCE sessions_id_seq OWNED BY NONE")
+    for index in ('id', 'refresh_token', 'family_id'):
+        op.execute(f"DROP INDEX IF EXISTS ix_sessions_{index}")
+    op.execute("DROP INDEX IF EXISTS ix_sessions_user_active")
+
+    # Unique constraints on a partitioned table must include the partition
+    # key, so refresh_token and family_id uniqueness is left to the generator
+    op.execute("""
+        CREATE TABLE sessions (
+            id INTEGER NOT NULL DEFAULT nextval('sessions_id_seq'),
+            user_id INTEGER REFERENCES users (id),
+            refresh_token VARCHAR,
+            family_id VARCHAR,
+            device_info VARCHAR,
+            ip_address VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            is_active BOOLEAN,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute(SESSION_INDEXES)
+    op.execute("ALTER SEQUENCE sessions_id_seq OWNED BY sessions.id")
+
+    # Takes rows outside the monthly partitions, e.g. once the premade
+    # months run out with partition maintenance disabled
+    op.execute("CREATE TABLE sessions_default PARTITION OF sessions DEFAULT")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    oldest = connection.execute(
+        sa.text("SELECT min(created_at) FROM sessions_legacy")
+    ).scalar()
+    # Monthly partitions from the oldest session's month on
+    start = add_months(min(oldest or now, now), 0)
+    last = add_months(now, PREMAKE_MONTHS)
+    while start <= last:
+        end = add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE sessions_p{start:%Y%m} PARTITION OF sessions "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        start = end
+
+    op.execute("""
+        INSERT INTO sessions (id, user_id, refresh_token, family_id, device_info,
+                              ip_address, created_at, expires_at, is_active)
+        SELECT id, user_id, refresh_token, family_id, device_info,
+               ip_address, created_at, expires_at, is_active
+        FROM sessions_legacy
+    """)
+    op.execute("DROP TABLE sessions_legacy")
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE sessions RENAME TO sessions_partitioned")
+    op.execute("ALTER INDEX sessions_pkey RENAME TO sessions_partitioned_pkey")
+    op.execute("ALTER SEQUENCE sessions_id_seq OWNED BY NONE")
+    for index in ('id', 'refresh_token', 'family_id', 'user_active'):
+        op.execute(f"DROP INDEX IF EXISTS ix_sessions_{index}")
+
+    op.execute("""
+        CREATE TABLE sessions (
+            id INTEGER NOT NULL DEFAULT nextval('sessions_id_seq') PRIMARY KEY,
+            user_id INTEGER REFERENCES users (id),
+            refresh_token VARCHAR,
+            family_id VARCHAR,
+            device_info VARCHAR,
+            ip_address VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            is_active BOOLEAN
+        )
+    """)
+    op.execute("ALTER SEQUENCE sessions_id_seq OWNED BY sessions.id")
+    op.execute("""
+        INSERT INTO sessions
+        SELECT id, user_id, refresh_token, family_id, device_info,
+               ip_address, created_at, expires_at, is_active
+        FROM sessions_partitioned
+    """)
+    op.execute("DROP TABLE sessions_partitioned CASCADE")
+    op.create_index(op.f('ix_sessions_id'), 'sessions', ['id'], unique=False)
+    op.create_index(op.f('ix_sessions_refresh_token'), 'sessions', ['refresh_token'], unique=True)
+    op.create_index(op.f('ix_sessions_family_id'), 'sessions', ['family_id'], unique=True)
+    op.create_index('ix_sessions_user_active', 'sessions', ['user_id', 'is_active', 'expires_at'], unique=False)
@@ -1,15 +1,18 @@
 from typing import Generator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
 from app import crud
 from app.core.config import settings
+from app.core.rbac import get_catalog
 from app.core.redis import is_blacklisted
 from app.core.security import verify_token
+from app.crud.user import AuthContext
 from app.db.session import SessionLocal
 from app.models.company import Company
 from app.models.permissions import Permission
@@ -29,9 +32,13 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+def get_session_factory() -> sessionmaker:
+    """Session factory of dependencies that open a session only when needed."""
+    return SessionLocal
+
+
+def get_token_user_id(token: str) -> int:
+    """Validate an access token and return its subject."""
     try:
         # Check if token is blacklisted
         if is_blacklisted(token):
@@ -62,22 +69,63 @@ def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return token_data.sub
 
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
-        )
-    return user
+
+class CurrentUserBearer(OAuth2PasswordBearer):
+    """
+    The authenticated user, as a cached AuthContext rather than a User.
+
+    Being the OAuth2 scheme itself, it is documented like reusable_oauth2
+    but only depends on the session factory: the AuthContext stored by
+    AuthContextMiddleware is returned as is, and a session is only opened
+    when the token has to be resolved here.
+    """
+
+    def __call__(
+        self,
+        request: Request,
+        session_factory: sessionmaker = Depends(get_session_factory),
+    ) -> AuthContext:
+        # Already resolved by AuthContextMiddleware when it is enabled
+        auth_context = getattr(request.state, "auth_context", None)
+        if auth_context is not None:
+            return auth_context
+
+        authorization = request.headers.get("Authorization")
+        scheme, token = get_authorization_scheme_param(authorization)
+        if not authorization or scheme.lower() != "bearer":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user_id = get_token_user_id(token)
+        db = session_factory()
+        try:
+            current_user = crud.user.get_auth_context(db, user_id)
+        finally:
+            db.close()
+        if not current_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        if not current_user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
+            )
+        return current_user
+
+
+get_current_user = CurrentUserBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login",
+    scheme_name=reusable_oauth2.scheme_name,
+)
 
 
 def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: AuthContext = Depends(get_current_user),
+) -> AuthContext:
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
@@ -86,8 +134,8 @@ def get_current_active_user(
 
 
 def get_current_active_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: AuthContext = Depends(get_current_user),
+) -> AuthContext:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -96,24 +144,33 @@ def get_current_active_superuser(
     return current_user
 
 
+def get_current_user_model(
+    db: Session = Depends(get_db),
+    current_user: AuthContext = Depends(get_current_active_user),
+) -> User:
+    """The authenticated user as an ORM object, for endpoints that need one."""
+    user = crud.user.get_user_by_id(db, user_id=current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return user
+
+
 def check_permissions(required_permissions: list[str]):
     def permission_checker(
-        current_user: User = Depends(get_current_user),
-    ) -> User:
-        user_permissions = []
-        for role in current_user.roles:
-            # Check if role belongs to user's company
-            if role.company_id == current_user.company_id:
-                for permission in role.permissions:
-                    user_permissions.append(permission.name)
-
+        db: Session = Depends(get_db),
+        current_user: AuthContext = Depends(get_current_user),
+    ) -> AuthContext:
         # Superusers in root company have all permissions
-        if current_user.is_superuser:
-            root_company = crud.company.get_root_company(db=SessionLocal())
-            if current_user.company_id == root_company.id:
-                return current_user
+        if current_user.is_superuser and crud.company.is_root_user(db, current_user):
+            return current_user
+
+        # The user's roles against the compiled catalog
+        catalog = get_catalog(db)
+        granted = catalog.grants(current_user.role_ids)
 
-        if not all(perm in user_permissions for perm in required_permissions):
+        if not catalog.allows(granted, catalog.mask_for(required_permissions)):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
             )
@@ -125,7 +182,7 @@ def check_permissions(required_permissions: list[str]):
 def get_user_by_id_from_path(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthContext = Depends(get_current_active_user),
 ) -> User:
     user = crud.user.get_user_by_id(db, user_id=user_id)
     if not user:
@@ -145,7 +202,7 @@ def get_user_by_id_from_path(
 def get_permission_by_id_from_path(
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: AuthContext = Depends(get_current_active_superuser),
 ) -> Permission:
     permission = crud.permission.get_permission(db, permission_id=permission_id)
     if not permission:
@@ -159,7 +216,7 @@ def get_permission_by_id_from_path(
 def get_role_by_id_from_path(
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthContext = Depends(get_current_active_user),
 ) -> Role:
     role = crud.role.get_role(db, role_id=role_id)
     if not role:
@@ -176,10 +233,35 @@ def get_role_by_id_from_path(
     return role
 
 
+def get_managed_role_from_path(
+    role_id: int,
+    db: Session = Depends(get_db),
+    current_user: AuthContext = Depends(get_current_active_superuser),
+) -> Role:
+    """
+    A role whose members, permissions or parents the current user may change:
+    root superusers may change any role, other superusers their company's.
+    """
+    role = crud.role.get_role(db, role_id=role_id)
+    if not role:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Role not found",
+        )
+    if role.company_id != current_user.company_id and not crud.company.is_root_user(
+        db, current_user
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges",
+        )
+    return role
+
+
 def get_resource_type_by_id_from_path(
     resource_type_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthContext = Depends(get_current_active_user),
 ) -> ResourceType:
     resource_type = crud.resource.get_resource_type(
         db, resource_type_id=resource_type_id
@@ -204,7 +286,7 @@ def get_resource_type_by_id_from_path(
 def get_company_by_id_from_path(
     company_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthContext = Depends(get_current_active_user),
 ) -> Company:
     company = crud.company.get_company_by_id(db, company_id=company_id)
     if not company:
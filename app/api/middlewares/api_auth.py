@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 
 from app import crud
 from app.api import deps
-from app.models.integration import Integration
+from app.crud.integration import IntegrationSnapshot
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
@@ -15,7 +15,7 @@ async def get_integration_from_api_key(
     request: Request,
     api_key: str = Depends(api_key_header),
     db: Session = Depends(deps.get_db),
-) -> Optional[Integration]:
+) -> Optional[IntegrationSnapshot]:
     """
     Dependency to get integration from API key.
     Returns None if no API key is provided or if the API key is invalid.
@@ -23,6 +23,11 @@ async def get_integration_from_api_key(
     if not api_key:
         return None
 
+    # Already resolved by AuthContextMiddleware when it is enabled
+    resolved = getattr(request.state, "integration", None)
+    if resolved is not None:
+        return resolved
+
     integration = crud.integration.get_integration_by_api_key(db, api_key=api_key)
 
     if integration and integration.is_active:
@@ -35,8 +40,8 @@ async def get_integration_from_api_key(
 
 
 async def require_api_key(
-    integration: Optional[Integration] = Depends(get_integration_from_api_key),
-) -> Integration:
+    integration: Optional[IntegrationSnapshot] = Depends(get_integration_from_api_key),
+) -> IntegrationSnapshot:
     """
     Dependency to require a valid API key.
     Raises 401 if no API key is provided or if the API key is invalid.
@@ -0,0 +1,81 @@
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import crud
+from app.api import deps
+
+
+class AuthContextMiddleware:
+    """
+    Pure ASGI middleware that resolves the caller once per request.
+
+    A bearer token is validated and turned into an AuthContext through the
+    cached lookups, and an X-API-Key into its active integration. Results
+    are stored in request.state, where the auth dependencies pick them up
+    instead of resolving them again. Nothing is rejected here: a missing or
+    invalid credential leaves the state empty and the dependencies produce
+    the usual error responses. Sessions come from session_factory, by
+    default the one deps.get_session_factory returns.
+    """
+
+    def __init__(
+        self, app: ASGIApp, session_factory: Optional[sessionmaker] = None
+    ) -> None:
+        self.app = app
+        self.session_factory = session_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = dict(scope["headers"])
+            authorization = headers.get(b"authorization", b"").decode("latin-1")
+            api_key = headers.get(b"x-api-key", b"").decode("latin-1")
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() != "bearer":
+                token = ""
+            if token or api_key:
+                state = scope.setdefault("state", {})
+                session_factory = self.session_factory or deps.get_session_factory()
+                state.update(
+                    await run_in_threadpool(
+                        resolve_credentials, session_factory, token, api_key
+                    )
+                )
+        await self.app(scope, receive, send)
+
+
+def resolve_credentials(
+    session_factory: sessionmaker, token: str, api_key: str
+) -> Dict[str, Any]:
+    resolved: Dict[str, Any] = {}
+    db = session_factory()
+    try:
+        if token:
+            auth_context = _resolve_token(db, token)
+            if auth_context is not None:
+                resolved["auth_context"] = auth_context
+                resolved["auth_token"] = token
+        if api_key:
+            integration = crud.integration.get_integration_by_api_key(
+                db, api_key=api_key
+            )
+            if integration and integration.is_active:
+                resolved["integration"] = integration
+                resolved["company_id"] = integration.company_id
+    finally:
+        db.close()
+    return resolved
+
+
+def _resolve_token(db: Session, token: str) -> Optional[crud.user.AuthContext]:
+    try:
+        user_id = deps.get_token_user_id(token)
+    except HTTPException:
+        return None
+    auth_context = crud.user.get_auth_context(db, user_id)
+    if auth_context is None or not auth_context.is_active:
+        return None
+    return auth_context
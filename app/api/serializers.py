@@ -0,0 +1,188 @@
+"""
+Serialization of large list responses straight from ORM objects to JSON,
+and streaming NDJSON/CSV exports.
+
+The list endpoints return a Response built here instead of letting FastAPI
+validate every item against its response model and then encode it again,
+whether the items are ORM objects or the JSON-ready listings served by the
+tenant cache. Field lists are taken from the response schemas so the
+output stays in step with the documented models.
+"""
+
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+from app.api import deps
+from app.core.config import settings
+from app.schemas.session import UserSessionSchema
+from app.schemas.user import User as UserSchema
+
+USER_FIELDS = tuple(UserSchema.model_fields)
+SESSION_FIELDS = tuple(UserSessionSchema.model_fields)
+
+
+def _pick(obj: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def serialize_users(users: Iterable[Any]) -> List[Dict[str, Any]]:
+    return [_pick(user, USER_FIELDS) for user in users]
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """Encode plain data with orjson, skipping response model validation"""
+    return Response(
+        content=orjson.dumps(
+            content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        ),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+class DataFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+EXPORT_MEDIA_TYPES = {
+    DataFormat.ndjson: "application/x-ndjson",
+    DataFormat.csv: "text/csv",
+}
+
+
+def decode_rows(stream: IO[bytes], data_format: DataFormat) -> Iterator[Any]:
+    """
+    Decode an uploaded NDJSON or CSV (with a header) file into one object
+    per row. Blank NDJSON lines are skipped and lines that are not valid
+    JSON are passed through as text, so the caller can report them. A file
+    that is not UTF-8 or not parseable CSV is rejected with a 400.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        yield from _decode_text_rows(text, data_format)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The uploaded file must be UTF-8 encoded",
+        )
+    except csv.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The uploaded file is not valid CSV: {e}",
+        )
+
+
+def _decode_text_rows(text: IO[str], data_format: DataFormat) -> Iterator[Any]:
+    if data_format is DataFormat.csv:
+        for row in csv.DictReader(text):
+            # Empty cells stand for missing values
+            yield {key: value for key, value in row.items() if value != ""}
+        return
+
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield line
+
+
+def _csv_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_rows(
+    rows: Iterable[Sequence[Any]],
+    fields: Sequence[str],
+    export_format: DataFormat,
+    batch_size: int,
+) -> Iterator[bytes]:
+    """
+    Encode rows of values in field order as NDJSON or CSV (with a header),
+    yielding one chunk per batch_size rows.
+    """
+    if export_format is DataFormat.csv:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+
+        def encode(row: Sequence[Any]) -> None:
+            writer.writerow([_csv_value(value) for value in row])
+
+        def flush() -> bytes:
+            chunk = buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+    else:
+        lines: List[bytes] = []
+        option = orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE
+
+        def encode(row: Sequence[Any]) -> None:
+            lines.append(orjson.dumps(dict(zip(fields, row)), option=option))
+
+        def flush() -> bytes:
+            chunk = b"".join(lines)
+            lines.clear()
+            return chunk
+
+    pending = 0
+    for row in rows:
+        encode(row)
+        pending += 1
+        if pending >= batch_size:
+            yield flush()
+            pending = 0
+    chunk = flush()
+    if chunk:
+        yield chunk
+
+
+def export_response(
+    build_query: Callable[[Session], Query],
+    columns: Sequence[Any],
+    fields: Sequence[str],
+    export_format: DataFormat,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Stream the rows of a query as NDJSON or CSV. The request session is
+    closed before the body is sent, so the rows are read through a session
+    owned by the stream and fetched in batches from one cursor.
+    """
+
+    def stream() -> Iterator[bytes]:
+        db = deps.SessionLocal()
+        try:
+            rows = (
+                build_query(db)
+                .with_entities(*columns)
+                .yield_per(settings.EXPORT_BATCH_SIZE)
+            )
+            yield from encode_rows(
+                rows, fields, export_format, settings.EXPORT_BATCH_SIZE
+            )
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}.{export_format.value}"'
+            )
+        },
+    )
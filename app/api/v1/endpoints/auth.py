@@ -1,5 +1,7 @@
-from datetime import datetime, timedelta, timezone
-from typing import Any
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
@@ -9,10 +11,14 @@ from app import crud
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.core.redis import add_to_blacklist
+from app.core.redis import (
+    add_to_blacklist,
+    cache_rotated_refresh_token,
+    get_rotated_refresh_token,
+    record_activity,
+)
 from app.core.security import verify_password
-from app.models.sessions import Session as UserSession
-from app.models.user import User
+from app.crud.user import AuthContext
 from app.schemas.user import PasswordReset, PasswordResetRequest, Token, TokenRefresh
 from app.schemas.user import User as UserSchema
 from app.schemas.user import UserCreate
@@ -45,24 +51,23 @@ def login(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
 
-    # Update last login
+    # Update last login, committed together with the new session
     user.last_login = datetime.now(timezone.utc)
-    db.commit()
 
     # Create session
+    family_id = uuid.uuid4().hex
     access_token = security.create_access_token(user.id)
-    refresh_token = security.create_refresh_token(user.id)
+    refresh_token = security.create_refresh_token(user.id, family_id=family_id)
 
-    session = UserSession(
+    crud.session.create_session(
+        db,
         user_id=user.id,
         refresh_token=refresh_token,
+        family_id=family_id,
         device_info=request.headers.get("User-Agent", "Unknown"),
         ip_address=request.client.host,
-        expires_at=datetime.now(timezone.utc)
-        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
     )
-    db.add(session)
-    db.commit()
+    record_activity(user.company_id, user.id, "login")
 
     return {
         "access_token": access_token,
@@ -76,7 +81,7 @@ def register(
     *,
     db: Session = Depends(deps.get_db),
     user_in: UserCreate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Create new user.
@@ -84,8 +89,7 @@ def register(
     """
     try:
         # Use company_id from current_user if not root
-        root_company = crud.company.get_root_company(db)
-        is_root_user = current_user.company_id == root_company.id
+        is_root_user = crud.company.is_root_user(db, current_user)
 
         # Non-root superusers can only create users in their own company
         if not is_root_user and user_in.company_id != current_user.company_id:
@@ -105,6 +109,20 @@ def register(
         )
 
 
+def _wait_for_rotated_tokens(refresh_token: str) -> Optional[dict]:
+    """
+    The tokens issued by a concurrent request that rotated refresh_token.
+    That request caches them only after its commit releases the row lock,
+    so the lookup is retried for a short while.
+    """
+    deadline = time.monotonic() + settings.REFRESH_TOKEN_ROTATION_WAIT_SECONDS
+    while True:
+        rotated = get_rotated_refresh_token(refresh_token)
+        if rotated or time.monotonic() >= deadline:
+            return rotated
+        time.sleep(0.05)
+
+
 @router.post("/refresh", response_model=Token)
 def refresh_token(
     *,
@@ -129,33 +147,72 @@ def refresh_token(
                 detail="Invalid refresh token",
             )
 
-        # Verify session exists and is valid
+        # Verify session exists and is valid. The row lock serializes
+        # concurrent refreshes of the same token.
         session = crud.session.get_session_by_refresh_token(
-            db, user_id=user_id, refresh_token=token_data.refresh_token
+            db,
+            user_id=user_id,
+            refresh_token=token_data.refresh_token,
+            for_update=True,
         )
 
         if not session:
+            # Logged out, expired or already revoked: nothing to wait for
+            family_id = payload.get("fam")
+            if not family_id or not crud.session.get_active_family_session(
+                db, family_id=family_id
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid refresh token",
+                )
+
+            # Token was rotated moments ago by a concurrent request: hand
+            # back the successor that request issued. No transaction is
+            # kept open while waiting.
+            db.rollback()
+            rotated = _wait_for_rotated_tokens(token_data.refresh_token)
+            if rotated:
+                return rotated
+
+            # Reuse of a rotated token outside the grace window means it
+            # may have leaked, so revoke the whole family
+            crud.session.revoke_session_family(db, family_id=family_id)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token",
             )
 
+        if not session.family_id:
+            session.family_id = uuid.uuid4().hex
+
         # Create new tokens
         access_token = security.create_access_token(user_id)
-        new_refresh_token = security.create_refresh_token(user_id)
-
-        # Update session
-        session.refresh_token = new_refresh_token
-        session.expires_at = datetime.now(timezone.utc) + timedelta(
-            days=settings.REFRESH_TOKEN_EXPIRE_DAYS
+        new_refresh_token = security.create_refresh_token(
+            user_id, family_id=session.family_id
         )
-        db.commit()
-
-        return {
+        tokens = {
             "access_token": access_token,
             "refresh_token": new_refresh_token,
             "token_type": "bearer",
         }
+
+        # Update session
+        session.refresh_token = new_refresh_token
+        session.expires_at = crud.session.get_session_expiry(session.created_at)
+        # Read before the commit expires them
+        company_id, session_user_id = session.user.company_id, session.user_id
+        db.commit()
+
+        # Only handed out once the rotation is committed
+        cache_rotated_refresh_token(
+            token_data.refresh_token,
+            tokens,
+            settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS,
+        )
+        record_activity(company_id, session_user_id, "refresh")
+
+        return tokens
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -165,7 +222,7 @@ def refresh_token(
 
 @router.post("/logout")
 def logout(
-    current_user: User = Depends(deps.get_current_user),
+    current_user: AuthContext = Depends(deps.get_current_user),
     db: Session = Depends(deps.get_db),
     token: str = Depends(deps.reusable_oauth2),
 ) -> Any:
@@ -0,0 +1,71 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api import deps
+from app.api.middlewares.api_auth import require_api_key
+from app.core.config import settings
+from app.core.rbac import get_catalog
+from app.crud.integration import IntegrationSnapshot
+from app.schemas.authz import AuthzCheckRequest, AuthzCheckResponse
+
+router = APIRouter()
+
+
+@router.post("/check", response_model=AuthzCheckResponse)
+def check_authorizations(
+    *,
+    db: Session = Depends(deps.get_db),
+    request_in: AuthzCheckRequest,
+    integration: IntegrationSnapshot = Depends(require_api_key),
+) -> Any:
+    """
+    Answer a batch of "can subject do permission (on resource)" checks.
+    Subjects are users of the integration's company; unknown or inactive
+    subjects are denied. Each subject's grants are loaded once per request.
+    """
+    checks = request_in.checks
+    if len(checks) > settings.AUTHZ_BATCH_MAX_CHECKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.AUTHZ_BATCH_MAX_CHECKS} checks per request",
+        )
+
+    catalog = get_catalog(db)
+    users = crud.user.get_users_by_ids(
+        db, (check.subject for check in checks), integration.company_id
+    )
+
+    # Granted bitset per active subject; None marks an unrestricted root superuser
+    granted: Dict[int, Any] = {}
+    for user in users:
+        if not user.is_active:
+            continue
+        if user.is_superuser and crud.company.is_root_user(db, user):
+            granted[user.id] = None
+        else:
+            role_ids = crud.permission.get_user_grants(db, user).role_ids
+            granted[user.id] = catalog.grants(role_ids)
+
+    masks: Dict[str, Any] = {}
+    results = []
+    for check in checks:
+        if check.subject not in granted:
+            results.append(False)
+            continue
+        subject_mask = granted[check.subject]
+        if subject_mask is None:
+            results.append(True)
+            continue
+        name = (
+            f"{check.resource}:{check.permission}"
+            if check.resource
+            else check.permission
+        )
+        if name not in masks:
+            masks[name] = catalog.mask_for([name])
+        results.append(catalog.allows(subject_mask, masks[name]))
+
+    return {"results": results}
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from app import crud
 from app.api import deps
-from app.models.user import User
+from app.crud.user import AuthContext
 from app.schemas.company import Company as CompanySchema
 from app.schemas.company import CompanyCreate, CompanyUpdate
 
@@ -17,7 +17,7 @@ def get_companies(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve companies based on user permissions.
@@ -35,7 +35,7 @@ def create_company(
     *,
     db: Session = Depends(deps.get_db),
     company_in: CompanyCreate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Create new company.
@@ -56,7 +56,7 @@ def get_company(
     *,
     db: Session = Depends(deps.get_db),
     company_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get company by ID.
@@ -87,7 +87,7 @@ def update_company(
     db: Session = Depends(deps.get_db),
     company_id: int,
     company_in: CompanyUpdate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Update a company.
@@ -116,7 +116,7 @@ def delete_company(
     *,
     db: Session = Depends(deps.get_db),
     company_id: int,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Delete a company.
@@ -5,9 +5,14 @@ from sqlalchemy.orm import Session
 
 from app import crud
 from app.api import deps
-from app.models.user import User
+from app.api.serializers import json_response
+from app.crud.user import AuthContext
 from app.schemas.integration import Integration as IntegrationSchema
-from app.schemas.integration import IntegrationCreate, IntegrationUpdate
+from app.schemas.integration import (
+    IntegrationCreate,
+    IntegrationUpdate,
+    IntegrationWithKey,
+)
 
 router = APIRouter()
 
@@ -17,32 +22,37 @@ def get_integrations(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve integrations for the current user's company.
     """
-    integrations = crud.integration.get_integrations(
-        db, company_id=current_user.company_id, skip=skip, limit=limit
+    return json_response(
+        crud.integration.get_integrations(
+            db, company_id=current_user.company_id, skip=skip, limit=limit
+        )
     )
-    return integrations
 
 
-@router.post("/", response_model=IntegrationSchema)
+@router.post("/", response_model=IntegrationWithKey)
 def create_integration(
     *,
     db: Session = Depends(deps.get_db),
     integration_in: IntegrationCreate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Create new integration.
     Only superusers can create integrations.
+    The API key is only returned here; store it, it cannot be shown again.
     """
-    integration = crud.integration.create_integration(
+    integration, api_key = crud.integration.create_integration(
         db=db, integration_in=integration_in, company_id=current_user.company_id
     )
-    return integration
+    return {
+        **IntegrationSchema.model_validate(integration).model_dump(),
+        "api_key": api_key,
+    }
 
 
 @router.get("/{integration_id}", response_model=IntegrationSchema)
@@ -50,7 +60,7 @@ def get_integration(
     *,
     db: Session = Depends(deps.get_db),
     integration_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get integration by ID.
@@ -82,7 +92,7 @@ def update_integration(
     db: Session = Depends(deps.get_db),
     integration_id: int,
     integration_in: IntegrationUpdate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Update integration.
@@ -117,7 +127,7 @@ def delete_integration(
     *,
     db: Session = Depends(deps.get_db),
     integration_id: int,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Delete integration.
@@ -150,7 +160,7 @@ def regenerate_api_secret(
     *,
     db: Session = Depends(deps.get_db),
     integration_id: int,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Regenerate API secret for an integration.
@@ -176,3 +186,40 @@ def regenerate_api_secret(
 
     integration = crud.integration.regenerate_api_secret(db, db_obj=integration)
     return integration
+
+
+@router.post("/{integration_id}/regenerate-key", response_model=IntegrationWithKey)
+def regenerate_api_key(
+    *,
+    db: Session = Depends(deps.get_db),
+    integration_id: int,
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Regenerate the API key of an integration; the previous key is revoked.
+    Only superusers can regenerate API keys.
+    The new API key is only returned here; store it, it cannot be shown again.
+    """
+    integration = crud.integration.get_integration(db, integration_id=integration_id)
+
+    if not integration:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Integration not found",
+        )
+
+    # Check if integration belongs to user's company
+    if (
+        integration.company_id != current_user.company_id
+        and not current_user.is_superuser
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this integration",
+        )
+
+    integration, api_key = crud.integration.regenerate_api_key(db, db_obj=integration)
+    return {
+        **IntegrationSchema.model_validate(integration).model_dump(),
+        "api_key": api_key,
+    }
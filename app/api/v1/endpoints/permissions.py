@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from app import crud
 from app.api import deps
+from app.api.serializers import json_response
 from app.models.permissions import Permission
 from app.schemas.permission import Permission as PermissionSchema
 from app.schemas.permission import PermissionCreate, PermissionUpdate
@@ -22,12 +23,7 @@ def read_permissions(
     """
     Retrieve permissions.
     """
-    permissions = crud.permission.get_permissions(db, skip=skip, limit=limit)
-    # Add resource name to each permission
-    for permission in permissions:
-        if permission.resource_type:
-            permission.resource = permission.resource_type.name
-    return permissions
+    return json_response(crud.permission.get_permissions(db, skip=skip, limit=limit))
 
 
 @router.post("/", response_model=PermissionSchema)
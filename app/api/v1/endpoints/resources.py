@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from app import crud
 from app.api import deps
+from app.api.serializers import json_response
 from app.models.resource import ResourceType
 from app.schemas.resource import ResourceType as ResourceTypeSchema
 from app.schemas.resource import ResourceTypeCreate, ResourceTypeUpdate
@@ -22,8 +23,7 @@ def read_resource_types(
     """
     Retrieve resource types.
     """
-    resource_types = crud.resource.get_resource_types(db, skip=skip, limit=limit)
-    return resource_types
+    return json_response(crud.resource.get_resource_types(db, skip=skip, limit=limit))
 
 
 @router.post("/", response_model=ResourceTypeSchema)
@@ -1,58 +1,58 @@
-from typing import Any
+from typing import Any, List, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app import crud
 from app.api import deps
+from app.api.serializers import json_response
+from app.crud.user import AuthContext
 from app.models.permissions import Permission
 from app.models.roles import Role
-from app.models.user import User
 from app.schemas.role import Role as RoleSchema
-from app.schemas.role import RoleCreate, RoleUpdate, RoleWithPermissions
+from app.schemas.role import (
+    RoleCatalog,
+    RoleCreate,
+    RoleLinksResult,
+    RolePermissionsUpdate,
+    RoleUpdate,
+    RoleUsersUpdate,
+    RoleWithParents,
+    RoleWithPermissions,
+)
 
 router = APIRouter()
 
 
 # Role endpoints
-@router.get("/")
+@router.get(
+    "/",
+    response_model=Union[List[RoleWithPermissions], List[RoleSchema], RoleCatalog],
+)
 def read_roles(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
     include_permissions: bool = True,
-    current_user: User = Depends(deps.get_current_active_user),
+    normalized: bool = False,
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Retrieve roles with optional permissions.
+    Retrieve roles, with their permissions unless include_permissions=false.
+    With normalized=true, roles carry permission_ids and every permission
+    and resource type is listed once in maps keyed by id.
     """
-    roles = crud.role.get_roles(
-        db,
-        skip=skip,
-        limit=limit,
-        include_permissions=include_permissions,
-        current_user=current_user,
+    return json_response(
+        crud.role.get_roles(
+            db,
+            skip=skip,
+            limit=limit,
+            include_permissions=include_permissions,
+            normalized=normalized,
+            current_user=current_user,
+        )
     )
 
-    if include_permissions:
-        # Return roles with permissions
-        result = []
-        for role in roles:
-            # Try to validate with more explicit conversion
-            validated_role = RoleWithPermissions.model_validate(
-                {
-                    **role.__dict__,
-                    "permissions": [
-                        {**p.__dict__, "name": p.name} for p in role.permissions
-                    ],
-                }
-            )
-            result.append(validated_role)
-        return result
-    else:
-        # Return roles without permissions
-        return [RoleSchema.model_validate(role) for role in roles]
-
 
 @router.get("/{role_id}", response_model=RoleWithPermissions)
 def read_role(
@@ -70,7 +70,7 @@ def create_role(
     *,
     db: Session = Depends(deps.get_db),
     role_in: RoleCreate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Create new role.
@@ -132,3 +132,133 @@ def remove_permission_from_role(
     Remove a permission from a role.
     """
     return crud.role.remove_permission_from_role(db, role=role, permission=permission)
+
+
+def _get_parent_role(db: Session, parent_id: int) -> Role:
+    parent = crud.role.get_role(db, role_id=parent_id)
+    if not parent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Parent role not found",
+        )
+    return parent
+
+
+@router.post("/{role_id}/parents/{parent_id}", response_model=RoleWithParents)
+def add_role_parent(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    parent_id: int,
+) -> Any:
+    """
+    Make a role inherit the permissions of another role of its company.
+    """
+    parent = _get_parent_role(db, parent_id)
+    return crud.role.add_role_parent(db, role=role, parent=parent)
+
+
+@router.delete("/{role_id}/parents/{parent_id}", response_model=RoleWithParents)
+def remove_role_parent(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    parent_id: int,
+) -> Any:
+    """
+    Stop a role from inheriting the permissions of another role.
+    """
+    parent = _get_parent_role(db, parent_id)
+    return crud.role.remove_role_parent(db, role=role, parent=parent)
+
+
+@router.post("/{role_id}/users", response_model=RoleLinksResult)
+def add_role_users(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    body: RoleUsersUpdate,
+) -> Any:
+    """
+    Add users to a role; users already assigned are skipped.
+    Only users of the role's company are assigned.
+    """
+    return crud.role.update_role_users(
+        db, role=role, user_ids=body.user_ids, mode="add"
+    )
+
+
+@router.put("/{role_id}/users", response_model=RoleLinksResult)
+def replace_role_users(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    body: RoleUsersUpdate,
+) -> Any:
+    """
+    Replace the users of a role with the given list.
+    Only users of the role's company are assigned.
+    """
+    return crud.role.update_role_users(
+        db, role=role, user_ids=body.user_ids, mode="replace"
+    )
+
+
+@router.delete("/{role_id}/users", response_model=RoleLinksResult)
+def remove_role_users(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    body: RoleUsersUpdate,
+) -> Any:
+    """
+    Remove users from a role; users not assigned to it are skipped.
+    """
+    return crud.role.update_role_users(
+        db, role=role, user_ids=body.user_ids, mode="remove"
+    )
+
+
+@router.post("/{role_id}/permissions", response_model=RoleLinksResult)
+def add_role_permissions(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    body: RolePermissionsUpdate,
+) -> Any:
+    """
+    Add permissions to a role; permissions already assigned are skipped.
+    """
+    return crud.role.update_role_permissions(
+        db, role=role, permission_ids=body.permission_ids, mode="add"
+    )
+
+
+@router.put("/{role_id}/permissions", response_model=RoleLinksResult)
+def replace_role_permissions(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    body: RolePermissionsUpdate,
+) -> Any:
+    """
+    Replace the permissions of a role with the given list.
+    """
+    return crud.role.update_role_permissions(
+        db, role=role, permission_ids=body.permission_ids, mode="replace"
+    )
+
+
+@router.delete("/{role_id}/permissions", response_model=RoleLinksResult)
+def remove_role_permissions(
+    *,
+    db: Session = Depends(deps.get_db),
+    role: Role = Depends(deps.get_managed_role_from_path),
+    body: RolePermissionsUpdate,
+) -> Any:
+    """
+    Remove permissions from a role.
+    """
+    return crud.role.update_role_permissions(
+        db, role=role, permission_ids=body.permission_ids, mode="remove"
+    )
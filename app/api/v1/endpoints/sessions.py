@@ -8,7 +8,7 @@ from app import crud
 from app.api import deps
 from app.core import security
 from app.core.redis import add_to_blacklist
-from app.models.user import User
+from app.crud.user import AuthContext
 from app.schemas.session import UserSessionSchema
 
 router = APIRouter()
@@ -18,7 +18,7 @@ router = APIRouter()
 def get_my_sessions(
     *,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get current user's active sessions.
@@ -31,7 +31,7 @@ def revoke_session(
     *,
     db: Session = Depends(deps.get_db),
     session_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Revoke a specific session.
@@ -63,7 +63,7 @@ def revoke_session(
 def revoke_all_sessions(
     *,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
     token: str = Depends(deps.reusable_oauth2),
 ) -> Any:
     """
@@ -108,7 +108,7 @@ def admin_revoke_session(
     *,
     db: Session = Depends(deps.get_db),
     session_id: int,
-    _: User = Depends(deps.get_current_active_superuser),
+    _: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Revoke any session (admin only).
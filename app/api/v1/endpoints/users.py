@@ -1,23 +1,42 @@
-from datetime import datetime, timedelta, timezone
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from sqlalchemy.orm import Session
 
 from app import crud
 from app.api import deps
+from app.api.serializers import (
+    SESSION_FIELDS,
+    USER_FIELDS,
+    DataFormat,
+    decode_rows,
+    export_response,
+    json_response,
+    serialize_users,
+)
+from app.core.cache import SnapshotCache
+from app.core.config import settings
+from app.core.redis import get_activity_stats
+from app.crud.user import AuthContext
+from app.models.sessions import Session as UserSession
 from app.models.user import User
 from app.schemas.session import UserSessionSchema
-from app.schemas.user import ActiveUsersStats
+from app.schemas.user import ActiveUsersStats, ActivityStats, PrincipalCacheStats
 from app.schemas.user import User as UserSchema
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import UserCreate, UserImportResult, UserUpdate
 
 router = APIRouter()
 
+# Dashboards poll the stats endpoint, so snapshots are shared per company
+active_stats_cache = SnapshotCache(
+    ttl=settings.STATS_CACHE_TTL_SECONDS,
+    stale_ttl=settings.STATS_CACHE_STALE_SECONDS,
+)
+
 
 @router.get("/me", response_model=UserSchema)
 def read_user_me(
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_current_user_model),
 ) -> Any:
     """
     Get current user.
@@ -30,7 +49,7 @@ def update_user_me(
     *,
     db: Session = Depends(deps.get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_current_user_model),
 ) -> Any:
     """
     Update own user.
@@ -50,42 +69,81 @@ def update_user_me(
 def get_active_users_stats(
     *,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Get statistics about active users and sessions.
     For regular superusers, scoped to their company.
     For root superusers, global stats.
+    Served from a per-company snapshot refreshed every few seconds.
     """
     # Check if user is from root company
-    root_company = crud.company.get_root_company(db)
-    is_root_user = current_user.company_id == root_company.id
+    is_root_user = crud.company.is_root_user(db, current_user)
 
-    # Get session statistics from CRUD
-    session_stats = crud.session.get_session_statistics(
-        db, company_id=None if is_root_user else current_user.company_id
-    )
+    company_id = None if is_root_user else current_user.company_id
+
+    def compute_stats() -> dict:
+        return {
+            **crud.session.get_session_statistics(db, company_id=company_id),
+            **crud.user.get_user_statistics(db, company_id=company_id),
+        }
+
+    return active_stats_cache.get_or_compute(company_id, compute_stats)
 
-    # Query filters
-    query_filters = []
-    if not is_root_user:
-        query_filters.append(User.company_id == current_user.company_id)
 
-    # Total users
-    total_users = db.query(User).filter(User.is_active == True, *query_filters).count()
+@router.get("/activity-stats", response_model=ActivityStats)
+def get_activity_stats_endpoint(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Get active users over the last 24 hours, 7 days and 30 days, plus hourly
+    login and refresh counts, from Redis counters.
+    For regular superusers, scoped to their company.
+    For root superusers, global stats.
+    """
+    # Check if user is from root company
+    is_root_user = crud.company.is_root_user(db, current_user)
+
+    return get_activity_stats(None if is_root_user else current_user.company_id)
 
-    # Users registered in last 7 days
-    last_7d = datetime.now(timezone.utc) - timedelta(days=7)
-    new_users_query = db.query(User).filter(User.created_at >= last_7d, *query_filters)
-    new_users_7d = new_users_query.count()
 
-    return {
-        "active_sessions_24h": session_stats["active_sessions_24h"],
-        "active_users_24h": session_stats["active_users_24h"],
-        "total_active_sessions": session_stats["total_active_sessions"],
-        "total_users": total_users,
-        "new_users_7d": new_users_7d,
-    }
+@router.get("/principal-cache-stats", response_model=PrincipalCacheStats)
+def get_principal_cache_stats(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Get the hit ratio of this process's cache of authenticated users, and
+    how stale a cached user may be. Only root superusers can see it.
+    """
+    if not crud.company.is_root_user(db, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only root superusers can see cache statistics",
+        )
+    return crud.user.get_principal_cache_stats()
+
+
+@router.get("/export")
+def export_users(
+    *,
+    export_format: DataFormat = Query(DataFormat.ndjson, alias="format"),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream every user visible to the current user, as in GET /users/,
+    as NDJSON or CSV.
+    """
+    return export_response(
+        lambda db: crud.user.users_query(db, current_user).order_by(User.id),
+        [getattr(User, field) for field in USER_FIELDS],
+        USER_FIELDS,
+        export_format,
+        "users",
+    )
 
 
 @router.get("/active-sessions", response_model=List[UserSessionSchema])
@@ -94,7 +152,7 @@ def get_active_sessions(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Get all active sessions (admin only).
@@ -102,8 +160,7 @@ def get_active_sessions(
     For root superusers, all sessions.
     """
     # Check if user is from root company
-    root_company = crud.company.get_root_company(db)
-    is_root_user = current_user.company_id == root_company.id
+    is_root_user = crud.company.is_root_user(db, current_user)
 
     return crud.session.get_all_active_sessions(
         db,
@@ -113,6 +170,31 @@ def get_active_sessions(
     )
 
 
+@router.get("/active-sessions/export")
+def export_active_sessions(
+    *,
+    db: Session = Depends(deps.get_db),
+    export_format: DataFormat = Query(DataFormat.ndjson, alias="format"),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Stream all active sessions (admin only) as NDJSON or CSV.
+    For regular superusers, scoped to their company.
+    For root superusers, all sessions.
+    """
+    # Check if user is from root company
+    is_root_user = crud.company.is_root_user(db, current_user)
+    company_id = None if is_root_user else current_user.company_id
+
+    return export_response(
+        lambda db: crud.session.active_sessions_query(db, company_id),
+        [getattr(UserSession, field) for field in SESSION_FIELDS],
+        SESSION_FIELDS,
+        export_format,
+        "active-sessions",
+    )
+
+
 @router.get("/{user_id}", response_model=UserSchema)
 def read_user_by_id(
     user: User = Depends(deps.get_user_by_id_from_path),
@@ -129,7 +211,7 @@ def read_users(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: AuthContext = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve users based on the user's permissions:
@@ -138,7 +220,7 @@ def read_users(
     - Regular users see only themselves
     """
     users = crud.user.get_users(db, skip=skip, limit=limit, current_user=current_user)
-    return users
+    return json_response(serialize_users(users))
 
 
 @router.post("/", response_model=UserSchema)
@@ -146,7 +228,7 @@ def create_user(
     *,
     db: Session = Depends(deps.get_db),
     user_in: UserCreate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Create new user.
@@ -154,8 +236,7 @@ def create_user(
     For root superusers, in any company.
     """
     # Check if user is from root company
-    root_company = crud.company.get_root_company(db)
-    is_root_user = current_user.company_id == root_company.id
+    is_root_user = crud.company.is_root_user(db, current_user)
 
     # Non-root superusers can only create users in their own company
     if not is_root_user and user_in.company_id != current_user.company_id:
@@ -175,13 +256,38 @@ def create_user(
     return crud.user.create_user(db, user_in=user_in)
 
 
+@router.post("/import", response_model=UserImportResult)
+def import_users(
+    *,
+    db: Session = Depends(deps.get_db),
+    file: UploadFile = File(...),
+    import_format: DataFormat = Query(DataFormat.ndjson, alias="format"),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Create users in bulk from an NDJSON or CSV file with UserCreate fields.
+    company_id defaults to the current user's company; regular superusers
+    can only import into their own company. Rows that fail are listed in
+    the returned error report and the others are created.
+    """
+    # Check if user is from root company
+    is_root_user = crud.company.is_root_user(db, current_user)
+
+    return crud.user.import_users(
+        db,
+        rows=decode_rows(file.file, import_format),
+        company_id=current_user.company_id,
+        own_company_only=not is_root_user,
+    )
+
+
 @router.put("/{user_id}", response_model=UserSchema)
 def update_user(
     *,
     db: Session = Depends(deps.get_db),
     user_in: UserUpdate,
     user: User = Depends(deps.get_user_by_id_from_path),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Update a user.
@@ -189,8 +295,7 @@ def update_user(
     - Company superusers can only update users in their company
     """
     # Check if user is from root company
-    root_company = crud.company.get_root_company(db)
-    is_root_user = current_user.company_id == root_company.id
+    is_root_user = crud.company.is_root_user(db, current_user)
 
     # Check if trying to change company
     if user_in.company_id is not None:
@@ -220,7 +325,7 @@ def delete_user(
     *,
     db: Session = Depends(deps.get_db),
     user: User = Depends(deps.get_user_by_id_from_path),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: AuthContext = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Delete a user.
@@ -228,13 +333,11 @@ def delete_user(
     - Company superusers can only delete in their company
     """
     # Prevent deleting root user
-    root_company = crud.company.get_root_company(db)
-
-    if user.is_superuser and user.company_id == root_company.id:
+    if user.is_superuser and crud.company.is_root_user(db, user):
         # Check if this is the only root superuser
         root_superusers = (
             db.query(User)
-            .filter(User.is_superuser == True, User.company_id == root_company.id)
+            .filter(User.is_superuser == True, User.company_id == user.company_id)
             .count()
         )
 
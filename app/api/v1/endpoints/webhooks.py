@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.api.middlewares.api_auth import require_api_key
-from app.models.integration import Integration
+from app.crud.integration import IntegrationSnapshot
 
 router = APIRouter()
 
@@ -14,7 +14,7 @@ router = APIRouter()
 async def receive_webhook(
     integration_type: str,
     request: Request,
-    integration: Integration = Depends(require_api_key),
+    integration: IntegrationSnapshot = Depends(require_api_key),
     db: Session = Depends(deps.get_db),
 ) -> Any:
     """
@@ -51,7 +51,7 @@ async def receive_webhook(
 def process_webhook(
     integration_type: str,
     payload: Dict[str, Any],
-    integration: Integration,
+    integration: IntegrationSnapshot,
     db: Session,
 ) -> Dict[str, Any]:
     """
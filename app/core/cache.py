@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+# Every in-process cache, so they can be reset together
+_registry: List[Any] = []
+
+
+def register_local_cache(cache: Any) -> None:
+    """Include an object with a clear() method in clear_local_caches"""
+    _registry.append(cache)
+
+
+def clear_local_caches() -> None:
+    """Drop the contents of every in-process cache"""
+    for cache in _registry:
+        cache.clear()
+
+
+class SnapshotCache:
+    """
+    Per-key cache of computed snapshots with stale-while-revalidate.
+
+    Values younger than ttl are served as is. Up to stale_ttl past that, the
+    stale value is still served to everyone except the one caller that takes
+    the key's lock and recomputes it. Missing or fully expired keys block
+    callers on that lock, so concurrent callers share a single computation.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._guard = threading.Lock()
+        register_local_cache(self)
+
+    def _lock_for(self, key: Hashable) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry[0] if entry else None
+        if age is not None and age < self.ttl:
+            return entry[1]
+
+        lock = self._lock_for(key)
+        if age is not None and age < self.ttl + self.stale_ttl:
+            if not lock.acquire(blocking=False):
+                # Someone else is already refreshing this key
+                return entry[1]
+        else:
+            lock.acquire()
+
+        try:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            value = compute()
+            self._entries[key] = (time.monotonic(), value)
+            return value
+        finally:
+            lock.release()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache whose entries expire after ttl"""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        register_local_cache(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if time.monotonic() >= entry[0]:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
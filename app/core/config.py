@@ -32,6 +32,10 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     PASSWORD_RESET_TOKEN_EXPIRE_HOURS: int = 1
+    # Window in which a just-rotated refresh token returns its successor
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+    # How long a refresh that lost the race waits for the winner's tokens
+    REFRESH_TOKEN_ROTATION_WAIT_SECONDS: float = 0.5
 
     # Redis
     REDIS_HOST: str = "localhost"
@@ -61,7 +65,60 @@ class Settings(BaseSettings):
     REQUIRE_UPPERCASE: bool = True
 
     # Session
+    # Sessions slide forward by REFRESH_TOKEN_EXPIRE_DAYS on every refresh
+    # but never outlive SESSION_EXPIRE_DAYS from login
     SESSION_EXPIRE_DAYS: int = 30
+    # Oldest sessions are evicted at login beyond this count (0 = unlimited)
+    MAX_SESSIONS_PER_USER: int = 10
+
+    # Cleanup job for expired sessions and used tokens
+    CLEANUP_INTERVAL_SECONDS: int = 3600  # 0 disables the in-app schedule
+    CLEANUP_BATCH_SIZE: int = 1000
+    CLEANUP_LOCK_TIMEOUT_MS: int = 2000
+    CLEANUP_THROTTLE_SECONDS: float = 0.1
+    # Monthly partitions of time-partitioned tables (PostgreSQL)
+    PARTITION_PREMAKE_MONTHS: int = 3
+    PARTITION_RETENTION_MONTHS: int = 3
+
+    # Admin dashboard statistics snapshots
+    STATS_CACHE_TTL_SECONDS: int = 5
+    STATS_CACHE_STALE_SECONDS: int = 30
+
+    # Effective permission cache (Redis, plus a short-lived in-process copy)
+    PERMISSION_CACHE_TTL_SECONDS: int = 300
+    PERMISSION_CACHE_LOCAL_TTL_SECONDS: int = 5
+    PERMISSION_CACHE_LOCAL_SIZE: int = 10000
+    # Identity/status snapshot of authenticated users. Writes clear Redis at
+    # once; other processes may serve their local copy for up to the local
+    # TTL, which bounds how long a deactivated user keeps access
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_LOCAL_TTL_SECONDS: int = 5
+    PRINCIPAL_CACHE_LOCAL_SIZE: int = 10000
+    # Cached CRUD reads keyed by per-company generations. The local TTL bounds
+    # how long another process's write can go unnoticed
+    TENANT_CACHE_TTL_SECONDS: int = 300
+    TENANT_CACHE_LOCAL_TTL_SECONDS: int = 5
+    TENANT_CACHE_LOCAL_SIZE: int = 1000
+    # Integrations looked up by API key prefix. Each process keeps them for
+    # the TTL and drops them once it sees a write published through Redis,
+    # which it checks for every INTEGRATION_CACHE_CHECK_SECONDS
+    INTEGRATION_CACHE_TTL_SECONDS: int = 30
+    INTEGRATION_CACHE_LOCAL_SIZE: int = 10000
+    INTEGRATION_CACHE_CHECK_SECONDS: float = 1.0
+    # How often each process checks for a new RBAC catalog version
+    RBAC_CATALOG_CHECK_SECONDS: float = 1.0
+    # Resolve bearer tokens and API keys once per request in an ASGI
+    # middleware instead of in the route dependencies
+    AUTH_MIDDLEWARE_ENABLED: bool = False
+    # Rows fetched per round trip and emitted per chunk by streaming exports
+    EXPORT_BATCH_SIZE: int = 1000
+    # Bulk user import: rows per INSERT statement, rows per upload, and
+    # processes used to hash passwords (0 = one per CPU)
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_MAX_ROWS: int = 10000
+    PASSWORD_HASH_WORKERS: int = 0
+    # Largest number of checks accepted by one /authz/check request
+    AUTHZ_BATCH_MAX_CHECKS: int = 10000
 
     # 2FA
     ENABLE_2FA: bool = False
@@ -0,0 +1,56 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Sequence
+
+DEFAULT_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Thread-safe bucketed histogram of observed values"""
+
+    def __init__(
+        self, name: str, buckets: Sequence[float] = DEFAULT_DURATION_BUCKETS
+    ) -> None:
+        self.name = name
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """Cumulative bucket counts keyed by upper bound, plus count and sum"""
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+                cumulative += count
+                buckets[f"le_{bound}"] = cumulative
+            return {"buckets": buckets, "count": self._count, "sum": self._sum}
+
+
+class Counter:
+    """Thread-safe counter of labelled events"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[label] = self._counts.get(label, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
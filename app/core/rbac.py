@@ -0,0 +1,176 @@
+"""
+In-memory RBAC catalog.
+
+Every permission is given a bit position and every role is compiled to the
+bitset of the permissions it grants, so checking a principal against a set
+of required permissions is a single AND-mask comparison. Permission names
+are unique across companies, so one bit space serves every company; a
+role's bitset contains the permissions assigned to it and to every role it
+inherits from, read from the role closure table.
+
+Wildcard permissions ("users:*", "*:read", "*") are compiled when the
+catalog is built: a role holding one also holds the bit of every
+permission it covers, so checks never walk grant patterns. A permission
+name is "<resource>:<action>" and a "*" segment matches any value of that
+segment, itself included; partial patterns such as "user*" are literal.
+Requiring a wildcard name is only satisfied by an equal or broader grant.
+Wildcards cover the permissions known to the catalog, so a check for a
+name that is not a permission is still denied.
+
+The catalog is an immutable snapshot tagged with a version kept in Redis.
+Writes that change permissions or role grants bump the version, and each
+process swaps in a freshly built snapshot once it sees the new version.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import register_local_cache
+from app.core.config import settings
+from app.core.redis import bump_rbac_catalog_version, get_rbac_catalog_version
+from app.models.permissions import Permission
+from app.models.roles import RoleClosure, RolePermission
+
+WILDCARD = "*"
+
+
+class RBACCatalog:
+    """Immutable mapping of permissions to bits and roles to bitsets"""
+
+    __slots__ = ("version", "bits", "role_masks")
+
+    def __init__(
+        self, version: int, bits: Dict[str, int], role_masks: Dict[int, int]
+    ) -> None:
+        self.version = version
+        self.bits = bits
+        self.role_masks = role_masks
+
+    def mask_for(self, permission_names: Iterable[str]) -> Optional[int]:
+        """Bitset of the named permissions, or None if any is unknown"""
+        mask = 0
+        for name in permission_names:
+            bit = self.bits.get(name)
+            if bit is None:
+                return None
+            mask |= 1 << bit
+        return mask
+
+    def grants(self, role_ids: Iterable[int]) -> int:
+        """Bitset of the permissions granted by any of the roles"""
+        mask = 0
+        for role_id in role_ids:
+            mask |= self.role_masks.get(role_id, 0)
+        return mask
+
+    @staticmethod
+    def allows(granted: int, required: Optional[int]) -> bool:
+        return required is not None and granted & required == required
+
+
+def compile_wildcards(bits: Dict[str, int]) -> Dict[int, int]:
+    """Map the bit of each wildcard permission to the bitset it covers"""
+    every = 0
+    by_resource: Dict[str, int] = {}
+    by_action: Dict[str, int] = {}
+    for name, bit in bits.items():
+        resource, _, action = name.partition(":")
+        every |= 1 << bit
+        by_resource[resource] = by_resource.get(resource, 0) | (1 << bit)
+        by_action[action] = by_action.get(action, 0) | (1 << bit)
+
+    coverage: Dict[int, int] = {}
+    for name, bit in bits.items():
+        resource, _, action = name.partition(":")
+        if name == WILDCARD or resource == action == WILDCARD:
+            coverage[bit] = every
+        elif resource == WILDCARD:
+            coverage[bit] = by_action[action]
+        elif action == WILDCARD:
+            coverage[bit] = by_resource[resource]
+    return coverage
+
+
+def build_catalog(db: Session, version: int) -> RBACCatalog:
+    """Load permissions and effective role grants and compile them to bitsets"""
+    permission_ids = [
+        (permission_id, name)
+        for permission_id, name in db.query(Permission.id, Permission.name).order_by(
+            Permission.id
+        )
+    ]
+    bit_by_id = {
+        permission_id: bit for bit, (permission_id, _) in enumerate(permission_ids)
+    }
+    bits = {name: bit_by_id[permission_id] for permission_id, name in permission_ids}
+
+    role_masks: Dict[int, int] = {}
+    for role_id, permission_id in db.query(
+        RoleClosure.role_id, RolePermission.permission_id
+    ).join(RolePermission, RolePermission.role_id == RoleClosure.inherited_role_id):
+        bit = bit_by_id.get(permission_id)
+        if bit is not None:
+            role_masks[role_id] = role_masks.get(role_id, 0) | (1 << bit)
+
+    coverage = compile_wildcards(bits)
+    if coverage:
+        for role_id, mask in role_masks.items():
+            for bit, covered in coverage.items():
+                if mask >> bit & 1:
+                    mask |= covered
+            role_masks[role_id] = mask
+
+    return RBACCatalog(version=version, bits=bits, role_masks=role_masks)
+
+
+class _CatalogState:
+    """The current snapshot of this process"""
+
+    def __init__(self) -> None:
+        self.catalog: Optional[RBACCatalog] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        register_local_cache(self)
+
+    def clear(self) -> None:
+        self.catalog = None
+
+
+_state = _CatalogState()
+
+
+def get_catalog(db: Session) -> RBACCatalog:
+    """
+    Get the current catalog. The Redis version is checked at most every
+    RBAC_CATALOG_CHECK_SECONDS; a new version triggers a rebuild that is
+    swapped in atomically.
+    """
+    catalog = _state.catalog
+    now = time.monotonic()
+    if (
+        catalog is not None
+        and now - _state.checked_at < settings.RBAC_CATALOG_CHECK_SECONDS
+    ):
+        return catalog
+
+    version = get_rbac_catalog_version()
+    if catalog is not None and catalog.version == version:
+        _state.checked_at = now
+        return catalog
+
+    with _state.lock:
+        catalog = _state.catalog
+        if catalog is None or catalog.version != version:
+            catalog = build_catalog(db, version)
+            _state.catalog = catalog
+        _state.checked_at = now
+    return catalog
+
+
+def invalidate_catalog() -> None:
+    """Publish a new catalog version and drop this process's snapshot"""
+    bump_rbac_catalog_version()
+    _state.clear()
@@ -1,3 +1,9 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
 import redis
 
 from app.core.config import settings
@@ -5,6 +11,8 @@ from app.core.config import settings
 redis_url = f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
 redis_client = redis.from_url(redis_url)
 
+logger = logging.getLogger(__name__)
+
 
 def add_to_blacklist(token: str, expires_in: int) -> None:
     """Add a token to the blacklist with expiration"""
@@ -33,3 +41,176 @@ def check_rate_limit(key: str, limit: int, window: int = 60) -> bool:
     """Check if rate limit is exceeded"""
     current = increment_rate_limit(key, window)
     return current <= limit
+
+
+def _refresh_token_key(token: str) -> str:
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    return f"refresh:rotated:{digest}"
+
+
+def cache_rotated_refresh_token(token: str, tokens: dict, expires_in: int) -> None:
+    """Remember the tokens issued when rotating a refresh token"""
+    redis_client.setex(_refresh_token_key(token), expires_in, json.dumps(tokens))
+
+
+def get_rotated_refresh_token(token: str) -> Optional[dict]:
+    """Get the tokens issued when a refresh token was rotated, if still cached"""
+    cached = redis_client.get(_refresh_token_key(token))
+    if not cached:
+        return None
+    return json.loads(cached)
+
+
+# Activity counters are kept per company and under this scope for all companies
+ACTIVITY_GLOBAL_SCOPE = "all"
+ACTIVITY_HOUR_TTL = 2 * 24 * 3600
+ACTIVITY_DAY_TTL = 31 * 24 * 3600
+
+
+def _hour_bucket(moment: datetime) -> str:
+    return moment.strftime("%Y%m%d%H")
+
+
+def _day_bucket(moment: datetime) -> str:
+    return moment.strftime("%Y%m%d")
+
+
+def record_activity(company_id: int, user_id: int, event: str) -> None:
+    """
+    Count an authentication event and mark the user active, bucketed by
+    hour and day. Best effort: Redis errors are logged, never raised.
+    """
+    now = datetime.now(timezone.utc)
+    hour, day = _hour_bucket(now), _day_bucket(now)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for scope in (ACTIVITY_GLOBAL_SCOPE, str(company_id)):
+        hour_users = f"activity:users:{scope}:h:{hour}"
+        day_users = f"activity:users:{scope}:d:{day}"
+        events = f"activity:{event}:{scope}:h:{hour}"
+        pipe.pfadd(hour_users, user_id)
+        pipe.expire(hour_users, ACTIVITY_HOUR_TTL)
+        pipe.pfadd(day_users, user_id)
+        pipe.expire(day_users, ACTIVITY_DAY_TTL)
+        pipe.incr(events)
+        pipe.expire(events, ACTIVITY_HOUR_TTL)
+    try:
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record {event} activity: {e}")
+
+
+def get_activity_stats(company_id: Optional[int] = None) -> dict:
+    """
+    Get active user estimates over the last 24 hours, 7 days and 30 days,
+    and hourly event counts for the last 24 hours (oldest first).
+    If company_id is None, stats cover all companies.
+    """
+    scope = ACTIVITY_GLOBAL_SCOPE if company_id is None else str(company_id)
+    now = datetime.now(timezone.utc)
+    hours = [_hour_bucket(now - timedelta(hours=i)) for i in reversed(range(24))]
+    days = [_day_bucket(now - timedelta(days=i)) for i in range(30)]
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.pfcount(*[f"activity:users:{scope}:h:{hour}" for hour in hours])
+    pipe.pfcount(*[f"activity:users:{scope}:d:{day}" for day in days[:7]])
+    pipe.pfcount(*[f"activity:users:{scope}:d:{day}" for day in days])
+    for event in ("login", "refresh"):
+        pipe.mget([f"activity:{event}:{scope}:h:{hour}" for hour in hours])
+    users_24h, users_7d, users_30d, logins, refreshes = pipe.execute()
+
+    def as_counts(values: List[Optional[bytes]]) -> List[int]:
+        return [int(value or 0) for value in values]
+
+    return {
+        "active_users_24h": users_24h,
+        "active_users_7d": users_7d,
+        "active_users_30d": users_30d,
+        "logins_per_hour": as_counts(logins),
+        "refreshes_per_hour": as_counts(refreshes),
+    }
+
+
+def get_cached_permissions(user_id: int) -> Optional[dict]:
+    """Get a user's cached roles and effective permissions, and their company"""
+    cached = redis_client.get(f"perms:{user_id}")
+    if not cached:
+        return None
+    return json.loads(cached)
+
+
+def cache_permissions(
+    user_id: int,
+    company_id: int,
+    role_ids: Iterable[int],
+    permissions: Iterable[str],
+    expires_in: int,
+) -> None:
+    """Cache a user's roles and effective permissions within a company"""
+    redis_client.setex(
+        f"perms:{user_id}",
+        expires_in,
+        json.dumps(
+            {
+                "company_id": company_id,
+                "role_ids": sorted(role_ids),
+                "permissions": sorted(permissions),
+            }
+        ),
+    )
+
+
+def delete_cached_permissions(user_ids: Iterable[int]) -> None:
+    keys = [f"perms:{user_id}" for user_id in user_ids]
+    if keys:
+        redis_client.delete(*keys)
+
+
+def get_cached_principal(user_id: int) -> Optional[dict]:
+    """Get a user's cached identity and status snapshot"""
+    cached = redis_client.get(f"principal:{user_id}")
+    if not cached:
+        return None
+    return json.loads(cached)
+
+
+def cache_principal(user_id: int, snapshot: dict, expires_in: int) -> None:
+    redis_client.setex(f"principal:{user_id}", expires_in, json.dumps(snapshot))
+
+
+def delete_cached_principals(user_ids: Iterable[int]) -> None:
+    keys = [f"principal:{user_id}" for user_id in user_ids]
+    if keys:
+        redis_client.delete(*keys)
+
+
+def get_rbac_catalog_version() -> int:
+    return int(redis_client.get("rbac:catalog:version") or 0)
+
+
+def bump_rbac_catalog_version() -> None:
+    redis_client.incr("rbac:catalog:version")
+
+
+def get_integration_cache_version() -> int:
+    return int(redis_client.get("integrations:cache:version") or 0)
+
+
+def bump_integration_cache_version() -> None:
+    redis_client.incr("integrations:cache:version")
+
+
+def get_tenant_generation(scope: str) -> int:
+    return int(redis_client.get(f"tenant:gen:{scope}") or 0)
+
+
+def bump_tenant_generation(scope: str) -> None:
+    redis_client.incr(f"tenant:gen:{scope}")
+
+
+def get_tenant_cache(key: str) -> Optional[bytes]:
+    return redis_client.get(f"tenant:cache:{key}")
+
+
+def set_tenant_cache(key: str, payload: bytes, expires_in: int) -> None:
+    redis_client.setex(f"tenant:cache:{key}", expires_in, payload)
@@ -1,5 +1,9 @@
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional, Union
+from typing import Any, List, Optional, Sequence, Union
 
 from jose import jwt
 from passlib.context import CryptContext
@@ -8,6 +12,9 @@ from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Started by the application lifespan; without it passwords are hashed inline
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: Optional[timedelta] = None
@@ -26,7 +33,9 @@ def create_access_token(
 
 
 def create_refresh_token(
-    subject: Union[str, Any], expires_delta: Optional[timedelta] = None
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    family_id: Optional[str] = None,
 ) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -34,7 +43,15 @@ def create_refresh_token(
         expire = datetime.now(timezone.utc) + timedelta(
             days=settings.REFRESH_TOKEN_EXPIRE_DAYS
         )
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "type": "refresh",
+        # Unique per token so rotations within the same second never collide
+        "jti": secrets.token_hex(16),
+    }
+    if family_id:
+        to_encode["fam"] = family_id
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
@@ -49,6 +66,36 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def start_password_hash_pool() -> None:
+    """
+    Start the long-lived process pool used by hash_passwords. Workers are
+    spawned rather than forked, as the server process runs threads.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS or None,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+
+def stop_password_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    """Hash many passwords in parallel across the process pool, if started."""
+    pool = _hash_pool
+    if pool is None or len(passwords) < 2:
+        return [get_password_hash(password) for password in passwords]
+    workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(get_password_hash, passwords, chunksize=chunksize))
+
+
 def verify_token(token: str) -> dict:
     try:
         decoded_token = jwt.decode(
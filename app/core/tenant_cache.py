@@ -0,0 +1,127 @@
+"""
+Cache-aside layer for tenant-scoped CRUD reads.
+
+Every cached read belongs to a scope: a company, or ALL_COMPANIES for reads
+spanning companies. Its key embeds the generation of that scope and the
+generation of SHARED data (permissions and resource types, which are listed
+across companies). A write bumps the generations it affects, which
+invalidates every cached read of those scopes with one INCR and no key
+scans; entries under old generations are never read again and expire.
+
+Results are validated into their response schema once, when loaded, and
+stored as JSON, kept both in an in-process LRU and in Redis. A cached read
+returns the decoded JSON-ready data rather than ORM instances or schemas,
+so endpoints send it without validating it again. Each process
+caches the Redis generations for the local TTL and also counts its own
+writes, so its reads never miss them.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.core.cache import LRUCache, register_local_cache
+from app.core.config import settings
+from app.core.redis import (
+    bump_tenant_generation,
+    get_tenant_cache,
+    get_tenant_generation,
+    set_tenant_cache,
+)
+
+ALL_COMPANIES = "all"
+SHARED = "shared"
+
+Scope = Union[int, str]
+
+_local_results = LRUCache(
+    maxsize=settings.TENANT_CACHE_LOCAL_SIZE,
+    ttl=settings.TENANT_CACHE_LOCAL_TTL_SECONDS,
+)
+# scope -> generation last read from Redis
+_remote_generations = LRUCache(
+    maxsize=settings.TENANT_CACHE_LOCAL_SIZE,
+    ttl=settings.TENANT_CACHE_LOCAL_TTL_SECONDS,
+)
+
+
+class _LocalGenerations:
+    """Number of writes made by this process per scope"""
+
+    def __init__(self) -> None:
+        self.counts: Dict[Scope, int] = {}
+        self.lock = threading.Lock()
+        register_local_cache(self)
+
+    def get(self, scope: Scope) -> int:
+        return self.counts.get(scope, 0)
+
+    def bump(self, scope: Scope) -> None:
+        with self.lock:
+            self.counts[scope] = self.counts.get(scope, 0) + 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.counts.clear()
+
+
+_local_generations = _LocalGenerations()
+
+
+def _generation(scope: Scope) -> Tuple[int, int]:
+    remote = _remote_generations.get(scope)
+    if remote is None:
+        remote = get_tenant_generation(str(scope))
+        _remote_generations.set(scope, remote)
+    return remote, _local_generations.get(scope)
+
+
+def cached_read(
+    company_id: Optional[int],
+    key: str,
+    load: Callable[[], Any],
+    adapter: TypeAdapter,
+) -> Any:
+    """
+    Return the result of load() for the key within a company, or across
+    companies when company_id is None, from the cache when possible. The
+    result of load() is validated into the adapter's type and returned as
+    the JSON-ready data of its fields, which is all that is cached.
+    """
+    scope: Scope = ALL_COMPANIES if company_id is None else company_id
+    shared_remote, shared_local = _generation(SHARED)
+    remote, local = _generation(scope)
+    remote_key = f"{scope}:{shared_remote}.{remote}:{key}"
+    local_key = f"{remote_key}:{shared_local}.{local}"
+
+    payload = _local_results.get(local_key)
+    if payload is None:
+        payload = get_tenant_cache(remote_key)
+        if payload is None:
+            value = adapter.validate_python(load(), from_attributes=True)
+            data = adapter.dump_python(value, mode="json")
+            payload = orjson.dumps(data)
+            set_tenant_cache(remote_key, payload, settings.TENANT_CACHE_TTL_SECONDS)
+            _local_results.set(local_key, payload)
+            return data
+        _local_results.set(local_key, payload)
+    return orjson.loads(payload)
+
+
+def _bump(scope: Scope) -> None:
+    bump_tenant_generation(str(scope))
+    _remote_generations.delete(scope)
+    _local_generations.bump(scope)
+
+
+def invalidate_tenant(company_id: int) -> None:
+    """Invalidate the cached reads of a company, after a write in it"""
+    _bump(company_id)
+    _bump(ALL_COMPANIES)
+
+
+def invalidate_shared() -> None:
+    """Invalidate every cached read, after a write to shared data"""
+    _bump(SHARED)
@@ -1,8 +1,10 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
 
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from app.core.cache import SnapshotCache
+from app.core.tenant_cache import invalidate_tenant
 from app.models.company import Company
 from app.models.user import User
 from app.schemas.company import CompanyCreate, CompanyUpdate
@@ -26,8 +28,40 @@ def get_company_by_name_or_id(
     )
 
 
-def get_root_company(db: Session) -> Optional[Company]:
-    return db.query(Company).filter(Company.is_root == True).first()
+class RootCompanyIdentity(NamedTuple):
+    id: int
+    name: str
+
+
+# The root company is seeded once and never deleted, so its identity is
+# loaded once per process
+_root_company_cache = SnapshotCache(ttl=float("inf"))
+
+
+def _load_root_company_identity(db: Session) -> Optional[RootCompanyIdentity]:
+    row = db.query(Company.id, Company.name).filter(Company.is_root == True).first()
+    return RootCompanyIdentity(id=row.id, name=row.name) if row else None
+
+
+def get_root_company_identity(db: Session) -> Optional[RootCompanyIdentity]:
+    """Get the cached root company identity, querying only on first use."""
+    root = _root_company_cache.get_or_compute(
+        "root", lambda: _load_root_company_identity(db)
+    )
+    if root is None:
+        # Not seeded yet, try again next time
+        invalidate_root_company_cache()
+    return root
+
+
+def invalidate_root_company_cache() -> None:
+    _root_company_cache.clear()
+
+
+def is_root_user(db: Session, user: User) -> bool:
+    """Whether the user belongs to the root company."""
+    root = get_root_company_identity(db)
+    return root is not None and user.company_id == root.id
 
 
 def get_companies(
@@ -58,6 +92,7 @@ def create_company(db: Session, *, company_in: CompanyCreate) -> Company:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_tenant(db_obj.id)
     return db_obj
 
 
@@ -87,6 +122,10 @@ def update_company(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_tenant(db_obj.id)
+
+    if db_obj.is_root:
+        invalidate_root_company_cache()
     return db_obj
 
 
@@ -97,5 +136,6 @@ def delete_company(db: Session, *, company_id: int) -> Optional[Company]:
     if company and not company.is_root:  # Never delete the root company
         db.delete(company)
         db.commit()
+        invalidate_tenant(company_id)
 
     return company
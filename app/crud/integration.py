@@ -1,54 +1,173 @@
+import hashlib
+import hmac
 import secrets
-import string
+import threading
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
+from app.core.cache import LRUCache, register_local_cache
+from app.core.config import settings
+from app.core.redis import bump_integration_cache_version, get_integration_cache_version
+from app.core.tenant_cache import cached_read, invalidate_tenant
 from app.models.integration import Integration
+from app.schemas.integration import Integration as IntegrationSchema
 from app.schemas.integration import IntegrationCreate, IntegrationUpdate
 
+# Length of the prefix of keys issued before keys had a "<prefix>." part
+LEGACY_KEY_PREFIX_LENGTH = 8
 
-def generate_api_credentials():
-    """Generate secure API key and secret"""
-    alphabet = string.ascii_letters + string.digits
-    api_key = "".join(secrets.choice(alphabet) for _ in range(32))
-    api_secret = "".join(secrets.choice(alphabet) for _ in range(64))
+
+class IntegrationSnapshot(NamedTuple):
+    id: int
+    name: str
+    integration_type: str
+    company_id: int
+    is_active: bool
+    callback_url: Optional[str]
+    configuration: Optional[Dict[str, Any]]
+    api_key_hash: str
+
+
+# Cached listings carry the public fields only, never the secret or key hash
+_integration_listing = TypeAdapter(List[IntegrationSchema])
+
+# api_key_prefix -> IntegrationSnapshot
+_api_key_integrations = LRUCache(
+    maxsize=settings.INTEGRATION_CACHE_LOCAL_SIZE,
+    ttl=settings.INTEGRATION_CACHE_TTL_SECONDS,
+)
+
+
+class _ApiKeyCacheState:
+    """The Redis version _api_key_integrations was filled under"""
+
+    def __init__(self) -> None:
+        self.version: Optional[int] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        register_local_cache(self)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.version = None
+            self.checked_at = 0.0
+
+
+_api_key_cache_state = _ApiKeyCacheState()
+
+
+def _sync_api_key_cache() -> None:
+    """
+    Drop this process's cached integrations once another process has
+    published a write. The Redis version is checked at most every
+    INTEGRATION_CACHE_CHECK_SECONDS.
+    """
+    now = time.monotonic()
+    if (
+        _api_key_cache_state.version is not None
+        and now - _api_key_cache_state.checked_at
+        < settings.INTEGRATION_CACHE_CHECK_SECONDS
+    ):
+        return
+
+    version = get_integration_cache_version()
+    with _api_key_cache_state.lock:
+        if version != _api_key_cache_state.version:
+            _api_key_integrations.clear()
+            _api_key_cache_state.version = version
+        _api_key_cache_state.checked_at = now
+
+
+def _invalidate_api_key(prefix: str) -> None:
+    """Publish a write to the integration holding prefix, dropping it here"""
+    bump_integration_cache_version()
+    _api_key_integrations.delete(prefix)
+
+
+def generate_api_credentials() -> Tuple[str, str]:
+    """Generate an API key, "<public prefix>.<secret>", and an API secret"""
+    api_key = f"{secrets.token_urlsafe(6)}.{secrets.token_urlsafe(32)}"
+    api_secret = secrets.token_urlsafe(48)
     return api_key, api_secret
 
 
+def get_api_key_prefix(api_key: str) -> str:
+    prefix, separator, _ = api_key.partition(".")
+    return prefix if separator else api_key[:LEGACY_KEY_PREFIX_LENGTH]
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
 def get_integration(db: Session, integration_id: int) -> Optional[Integration]:
     """Get integration by ID"""
     return db.query(Integration).filter(Integration.id == integration_id).first()
 
 
-def get_integration_by_api_key(db: Session, api_key: str) -> Optional[Integration]:
-    """Get integration by API key"""
-    return db.query(Integration).filter(Integration.api_key == api_key).first()
+def get_integration_by_api_key(
+    db: Session, api_key: str
+) -> Optional[IntegrationSnapshot]:
+    """
+    Get the integration holding an API key. Integrations are found by the
+    key prefix, served from a per-process cache once loaded, and the key is
+    checked against the stored hash.
+    """
+    prefix = get_api_key_prefix(api_key)
+    _sync_api_key_cache()
+    snapshot = _api_key_integrations.get(prefix)
+    if snapshot is None:
+        integration = (
+            db.query(Integration).filter(Integration.api_key_prefix == prefix).first()
+        )
+        if integration is None:
+            return None
+        snapshot = IntegrationSnapshot(
+            id=integration.id,
+            name=integration.name,
+            integration_type=integration.integration_type,
+            company_id=integration.company_id,
+            is_active=integration.is_active,
+            callback_url=integration.callback_url,
+            configuration=integration.configuration,
+            api_key_hash=integration.api_key_hash,
+        )
+        _api_key_integrations.set(prefix, snapshot)
+    if not hmac.compare_digest(snapshot.api_key_hash, hash_api_key(api_key)):
+        return None
+    return snapshot
 
 
 def get_integrations(
     db: Session, company_id: int, skip: int = 0, limit: int = 100
-) -> List[Integration]:
-    """Get all integrations for a company"""
-    return (
-        db.query(Integration)
+) -> List[Dict[str, Any]]:
+    """Get all integrations for a company, as JSON-ready data"""
+    return cached_read(
+        company_id,
+        f"integrations:{skip}:{limit}",
+        lambda: db.query(Integration)
         .filter(Integration.company_id == company_id)
         .offset(skip)
         .limit(limit)
-        .all()
+        .all(),
+        _integration_listing,
     )
 
 
 def create_integration(
     db: Session, *, integration_in: IntegrationCreate, company_id: int
-) -> Integration:
-    """Create a new integration"""
+) -> Tuple[Integration, str]:
+    """Create a new integration, returned with its API key"""
     api_key, api_secret = generate_api_credentials()
 
     db_obj = Integration(
         **integration_in.model_dump(),
-        api_key=api_key,
+        api_key_prefix=get_api_key_prefix(api_key),
+        api_key_hash=hash_api_key(api_key),
         api_secret=api_secret,
         company_id=company_id,
         is_active=True,
@@ -56,7 +175,8 @@ def create_integration(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
-    return db_obj
+    invalidate_tenant(company_id)
+    return db_obj, api_key
 
 
 def update_integration(
@@ -74,6 +194,8 @@ def update_integration(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_tenant(db_obj.company_id)
+    _invalidate_api_key(db_obj.api_key_prefix)
     return db_obj
 
 
@@ -83,6 +205,8 @@ def delete_integration(db: Session, *, integration_id: int) -> Optional[Integrat
     if integration:
         db.delete(integration)
         db.commit()
+        invalidate_tenant(integration.company_id)
+        _invalidate_api_key(integration.api_key_prefix)
     return integration
 
 
@@ -95,4 +219,26 @@ def regenerate_api_secret(db: Session, *, db_obj: Integration) -> Integration:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_tenant(db_obj.company_id)
+    _invalidate_api_key(db_obj.api_key_prefix)
     return db_obj
+
+
+def regenerate_api_key(db: Session, *, db_obj: Integration) -> Tuple[Integration, str]:
+    """
+    Replace the API key of an integration, returned with its new key. The
+    previous key stops working in this process at once, and in the others
+    within INTEGRATION_CACHE_CHECK_SECONDS.
+    """
+    api_key, _ = generate_api_credentials()
+    old_prefix = db_obj.api_key_prefix
+    db_obj.api_key_prefix = get_api_key_prefix(api_key)
+    db_obj.api_key_hash = hash_api_key(api_key)
+    db_obj.updated_at = datetime.now(timezone.utc)
+
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    invalidate_tenant(db_obj.company_id)
+    _invalidate_api_key(old_prefix)
+    return db_obj, api_key
@@ -1,10 +1,30 @@
-from typing import List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session, joinedload
 
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.rbac import invalidate_catalog
+from app.core.redis import (
+    cache_permissions,
+    delete_cached_permissions,
+    get_cached_permissions,
+)
+from app.core.tenant_cache import cached_read, invalidate_shared
 from app.models.permissions import Permission
-from app.schemas.permission import PermissionCreate, PermissionUpdate
+from app.models.roles import Role, RoleClosure, RolePermission, UserRole
+from app.models.user import User
+from app.schemas.permission import PermissionCreate, PermissionListing, PermissionUpdate
+
+_permission_listing = TypeAdapter(List[PermissionListing])
+
+# user_id -> (company_id, UserGrants); bounds cross-process staleness
+_local_permissions = LRUCache(
+    maxsize=settings.PERMISSION_CACHE_LOCAL_SIZE,
+    ttl=settings.PERMISSION_CACHE_LOCAL_TTL_SECONDS,
+)
 
 
 def get_permission_by_name(db: Session, name: str) -> Optional[Permission]:
@@ -20,14 +40,116 @@ def get_permission(db: Session, permission_id: int) -> Optional[Permission]:
     )
 
 
-def get_permissions(db: Session, skip: int = 0, limit: int = 100) -> List[Permission]:
-    return (
-        db.query(Permission)
+def get_permissions(
+    db: Session, skip: int = 0, limit: int = 100
+) -> List[Dict[str, Any]]:
+    """Get permissions, named after their resource type, as JSON-ready data."""
+    return cached_read(
+        None,
+        f"permission_listing:{skip}:{limit}",
+        lambda: db.query(Permission)
         .options(joinedload(Permission.resource_type))
         .offset(skip)
         .limit(limit)
+        .all(),
+        _permission_listing,
+    )
+
+
+def get_permission_user_ids(db: Session, permission_ids: Iterable[int]) -> List[int]:
+    """Get the users holding any of the permissions through a role."""
+    return [
+        user_id
+        for (user_id,) in db.query(UserRole.user_id)
+        .join(RoleClosure, RoleClosure.role_id == UserRole.role_id)
+        .join(RolePermission, RolePermission.role_id == RoleClosure.inherited_role_id)
+        .filter(RolePermission.permission_id.in_(list(permission_ids)))
+        .distinct()
+    ]
+
+
+class UserGrants(NamedTuple):
+    role_ids: FrozenSet[int]
+    permissions: FrozenSet[str]
+
+
+def _load_user_grants(db: Session, user_id: int, company_id: int) -> UserGrants:
+    rows = (
+        db.query(Role.id, Permission.name)
+        .select_from(UserRole)
+        .join(Role, Role.id == UserRole.role_id)
+        .outerjoin(RoleClosure, RoleClosure.role_id == Role.id)
+        .outerjoin(
+            RolePermission, RolePermission.role_id == RoleClosure.inherited_role_id
+        )
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+        .filter(UserRole.user_id == user_id, Role.company_id == company_id)
         .all()
     )
+    return UserGrants(
+        role_ids=frozenset(role_id for role_id, _ in rows),
+        permissions=frozenset(name for _, name in rows if name is not None),
+    )
+
+
+def get_cached_user_grants(user_id: int) -> Optional[Tuple[int, UserGrants]]:
+    """Get the cached (company_id, grants) of a user, without touching the DB."""
+    entry = _local_permissions.get(user_id)
+    if entry is not None:
+        return entry
+
+    cached = get_cached_permissions(user_id)
+    if not cached:
+        return None
+    entry = (
+        cached["company_id"],
+        UserGrants(
+            role_ids=frozenset(cached["role_ids"]),
+            permissions=frozenset(cached["permissions"]),
+        ),
+    )
+    _local_permissions.set(user_id, entry)
+    return entry
+
+
+def cache_user_grants(user_id: int, company_id: int, grants: UserGrants) -> None:
+    cache_permissions(
+        user_id,
+        company_id,
+        grants.role_ids,
+        grants.permissions,
+        settings.PERMISSION_CACHE_TTL_SECONDS,
+    )
+    _local_permissions.set(user_id, (company_id, grants))
+
+
+def get_user_grants(db: Session, user: User) -> UserGrants:
+    """
+    Get the user's roles in their company and the permission names those
+    roles grant, from the in-process cache, then Redis, then the database.
+    """
+    entry = get_cached_user_grants(user.id)
+    if entry is not None and entry[0] == user.company_id:
+        return entry[1]
+
+    grants = _load_user_grants(db, user.id, user.company_id)
+    cache_user_grants(user.id, user.company_id, grants)
+    return grants
+
+
+def get_user_permission_names(db: Session, user: User) -> FrozenSet[str]:
+    """Get the names of the permissions granted to the user in their company."""
+    return get_user_grants(db, user).permissions
+
+
+def invalidate_user_permissions(user_ids: Iterable[int]) -> None:
+    """Drop the cached effective permissions of the given users."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    delete_cached_permissions(user_ids)
+    for user_id in user_ids:
+        _local_permissions.delete(user_id)
 
 
 def create_permission(db: Session, *, permission_in: PermissionCreate) -> Permission:
@@ -42,6 +164,8 @@ def create_permission(db: Session, *, permission_in: PermissionCreate) -> Permis
     db.refresh(db_obj)
     # Load the resource_type relationship
     db.refresh(db_obj, ["resource_type"])
+    invalidate_catalog()
+    invalidate_shared()
     return db_obj
 
 
@@ -57,6 +181,8 @@ def update_permission(
                 detail="The permission with this name already exists in the system.",
             )
 
+    renamed = "name" in update_data and update_data["name"] != db_obj.name
+
     for field, value in update_data.items():
         setattr(db_obj, field, value)
 
@@ -65,12 +191,21 @@ def update_permission(
     db.refresh(db_obj)
     # Load the resource_type relationship
     db.refresh(db_obj, ["resource_type"])
+    invalidate_shared()
+
+    if renamed:
+        invalidate_catalog()
+        invalidate_user_permissions(get_permission_user_ids(db, [db_obj.id]))
     return db_obj
 
 
 def delete_permission(db: Session, *, permission_id: int) -> Optional[Permission]:
     permission = get_permission(db, permission_id)
     if permission:
+        affected_user_ids = get_permission_user_ids(db, [permission_id])
         db.delete(permission)
         db.commit()
+        invalidate_catalog()
+        invalidate_shared()
+        invalidate_user_permissions(affected_user_ids)
     return permission
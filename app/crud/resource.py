@@ -1,16 +1,27 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
+from app.core.tenant_cache import cached_read, invalidate_shared
 from app.models.resource import ResourceType
+from app.schemas.resource import ResourceType as ResourceTypeSchema
 from app.schemas.resource import ResourceTypeCreate, ResourceTypeUpdate
 
+_resource_type_listing = TypeAdapter(List[ResourceTypeSchema])
+
 
 def get_resource_types(
     db: Session, skip: int = 0, limit: int = 100
-) -> List[ResourceType]:
-    return db.query(ResourceType).offset(skip).limit(limit).all()
+) -> List[Dict[str, Any]]:
+    """Get resource types as JSON-ready data."""
+    return cached_read(
+        None,
+        f"resource_types:{skip}:{limit}",
+        lambda: db.query(ResourceType).offset(skip).limit(limit).all(),
+        _resource_type_listing,
+    )
 
 
 def get_resource_type(db: Session, resource_type_id: int) -> Optional[ResourceType]:
@@ -37,6 +48,7 @@ def create_resource_type(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_shared()
     return db_obj
 
 
@@ -58,6 +70,7 @@ def update_resource_type(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_shared()
     return db_obj
 
 
@@ -77,4 +90,5 @@ def delete_resource_type(db: Session, *, resource_type_id: int) -> ResourceType:
 
     db.delete(resource_type)
     db.commit()
+    invalidate_shared()
     return resource_type
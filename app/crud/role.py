@@ -1,12 +1,25 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Literal, Optional, Set
 
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import Select, delete, exists, insert, literal, or_, select, true
 from sqlalchemy.orm import Session, selectinload
 
+from app.core.rbac import invalidate_catalog
+from app.core.tenant_cache import cached_read, invalidate_tenant
+from app.crud.permission import invalidate_user_permissions
+from app.models.company import Company
 from app.models.permissions import Permission
-from app.models.roles import Role
+from app.models.roles import Role, RoleClosure, RoleParent, RolePermission, UserRole
 from app.models.user import User
-from app.schemas.role import RoleCreate, RoleUpdate
+from app.schemas.role import Role as RoleSchema
+from app.schemas.role import RoleCatalog, RoleCreate, RoleListing, RoleUpdate
+
+LinkMode = Literal["add", "remove", "replace"]
+
+_role_listing = TypeAdapter(List[RoleListing])
+_role_listing_without_permissions = TypeAdapter(List[RoleSchema])
+_role_catalog = TypeAdapter(RoleCatalog)
 
 
 def get_role_by_name(db: Session, name: str, company_id: int = None) -> Optional[Role]:
@@ -16,6 +29,27 @@ def get_role_by_name(db: Session, name: str, company_id: int = None) -> Optional
     return query.first()
 
 
+def get_role_user_ids(db: Session, role_ids: Iterable[int]) -> List[int]:
+    """Get the users assigned to any of the roles or to a role inheriting one."""
+    return [
+        user_id
+        for (user_id,) in db.query(UserRole.user_id)
+        .join(RoleClosure, RoleClosure.role_id == UserRole.role_id)
+        .filter(RoleClosure.inherited_role_id.in_(list(role_ids)))
+        .distinct()
+    ]
+
+
+def get_role_heir_ids(db: Session, role_id: int) -> Set[int]:
+    """Get the roles inheriting the role, the role itself included."""
+    return {
+        heir_id
+        for (heir_id,) in db.query(RoleClosure.role_id).filter(
+            RoleClosure.inherited_role_id == role_id
+        )
+    }
+
+
 def get_role(db: Session, role_id: int) -> Optional[Role]:
     return (
         db.query(Role)
@@ -25,24 +59,69 @@ def get_role(db: Session, role_id: int) -> Optional[Role]:
     )
 
 
+def role_catalog(roles: Iterable[Role]) -> Dict[str, Any]:
+    """
+    Roles referencing their permissions by id, with each permission and
+    resource type included once in maps keyed by id, to validate as a
+    RoleCatalog.
+    """
+    role_list = []
+    permissions: Dict[int, Permission] = {}
+    for role in roles:
+        data = {field: getattr(role, field) for field in RoleSchema.model_fields}
+        data["permission_ids"] = [permission.id for permission in role.permissions]
+        role_list.append(data)
+        for permission in role.permissions:
+            permissions.setdefault(permission.id, permission)
+    resource_types = {
+        permission.resource_type.id: permission.resource_type
+        for permission in permissions.values()
+        if permission.resource_type is not None
+    }
+    return {
+        "roles": role_list,
+        "permissions": permissions,
+        "resource_types": resource_types,
+    }
+
+
 def get_roles(
     db: Session,
     skip: int = 0,
     limit: int = 100,
     include_permissions: bool = True,
+    normalized: bool = False,
     current_user: User = None,
-) -> List[Role]:
+) -> Any:
+    """
+    Get roles as JSON-ready data: a list of roles, with their permissions
+    when include_permissions is set, or a RoleCatalog when normalized is.
+    """
     query = db.query(Role)
-    if include_permissions:
+    if include_permissions or normalized:
         query = query.options(
             selectinload(Role.permissions).selectinload(Permission.resource_type)
         )
 
     # Filter by company for non-superusers
+    company_id = None
     if current_user and not current_user.is_superuser:
-        query = query.filter(Role.company_id == current_user.company_id)
+        company_id = current_user.company_id
+        query = query.filter(Role.company_id == company_id)
 
-    return query.offset(skip).limit(limit).all()
+    if normalized:
+        return cached_read(
+            company_id,
+            f"role_catalog:{skip}:{limit}",
+            lambda: role_catalog(query.offset(skip).limit(limit).all()),
+            _role_catalog,
+        )
+    return cached_read(
+        company_id,
+        f"role_listing:{skip}:{limit}:{int(include_permissions)}",
+        lambda: query.offset(skip).limit(limit).all(),
+        _role_listing if include_permissions else _role_listing_without_permissions,
+    )
 
 
 def create_role(db: Session, *, role_in: RoleCreate, current_user: User) -> Role:
@@ -56,6 +135,7 @@ def create_role(db: Session, *, role_in: RoleCreate, current_user: User) -> Role
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_tenant(db_obj.company_id)
     return db_obj
 
 
@@ -75,14 +155,35 @@ def update_role(db: Session, *, db_obj: Role, obj_in: RoleUpdate) -> Role:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_tenant(db_obj.company_id)
     return db_obj
 
 
 def delete_role(db: Session, *, role_id: int) -> Optional[Role]:
     role = get_role(db, role_id)
     if role:
+        _lock_role_hierarchy(db, role.company_id)
+        affected_user_ids = get_role_user_ids(db, [role_id])
+        heir_ids = get_role_heir_ids(db, role_id) - {role_id}
+        db.execute(
+            delete(RoleParent).where(
+                or_(RoleParent.role_id == role_id, RoleParent.parent_id == role_id)
+            )
+        )
+        db.execute(
+            delete(RoleClosure).where(
+                or_(
+                    RoleClosure.role_id == role_id,
+                    RoleClosure.inherited_role_id == role_id,
+                )
+            )
+        )
+        _rebuild_closure(db, role.company_id, heir_ids)
         db.delete(role)
         db.commit()
+        invalidate_catalog()
+        invalidate_tenant(role.company_id)
+        invalidate_user_permissions(affected_user_ids)
     return role
 
 
@@ -97,6 +198,9 @@ def assign_permission_to_role(
     role.permissions.append(permission)
     db.commit()
     db.refresh(role)
+    invalidate_catalog()
+    invalidate_tenant(role.company_id)
+    invalidate_user_permissions(get_role_user_ids(db, [role.id]))
     return role
 
 
@@ -111,4 +215,194 @@ def remove_permission_from_role(
     role.permissions.remove(permission)
     db.commit()
     db.refresh(role)
+    invalidate_catalog()
+    invalidate_tenant(role.company_id)
+    invalidate_user_permissions(get_role_user_ids(db, [role.id]))
+    return role
+
+
+def _rebuild_closure(db: Session, company_id: int, role_ids: Set[int]) -> None:
+    """
+    Recompute the closure rows of the given roles from role_parent. Removing
+    an edge cannot be undone row by row, since another path may still link
+    the same pair, so the roles that inherited through it are walked again.
+    """
+    if not role_ids:
+        return
+    parents: Dict[int, List[int]] = {}
+    for role_id, parent_id in (
+        db.query(RoleParent.role_id, RoleParent.parent_id)
+        .join(Role, Role.id == RoleParent.role_id)
+        .filter(Role.company_id == company_id)
+    ):
+        parents.setdefault(role_id, []).append(parent_id)
+
+    rows = []
+    for role_id in role_ids:
+        inherited = {role_id}
+        pending = [role_id]
+        while pending:
+            for parent_id in parents.get(pending.pop(), ()):
+                if parent_id not in inherited:
+                    inherited.add(parent_id)
+                    pending.append(parent_id)
+        rows.extend(
+            {"role_id": role_id, "inherited_role_id": inherited_role_id}
+            for inherited_role_id in inherited
+        )
+
+    db.execute(
+        delete(RoleClosure)
+        .where(RoleClosure.role_id.in_(role_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(insert(RoleClosure), rows)
+
+
+def _lock_role_hierarchy(db: Session, company_id: int) -> None:
+    # Lock the company row so concurrent changes to its role hierarchy run
+    # one after another and each sees the closure the previous one left
+    db.query(Company.id).filter(Company.id == company_id).with_for_update().first()
+
+
+def add_role_parent(db: Session, *, role: Role, parent: Role) -> Role:
+    """Make the role inherit the permissions of the parent role."""
+    if parent.company_id != role.company_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parent role must belong to the same company",
+        )
+    _lock_role_hierarchy(db, role.company_id)
+    if db.query(
+        exists().where(RoleParent.role_id == role.id, RoleParent.parent_id == parent.id)
+    ).scalar():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Role already inherits from this role",
+        )
+    if db.query(
+        exists().where(
+            RoleClosure.role_id == parent.id, RoleClosure.inherited_role_id == role.id
+        )
+    ).scalar():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Role inheritance cannot contain cycles",
+        )
+
+    db.add(RoleParent(role_id=role.id, parent_id=parent.id))
+    # Every heir of the role now inherits everything the parent inherits
+    closure = RoleClosure.__table__
+    heirs = closure.alias("heirs")
+    inherited = closure.alias("inherited")
+    rows = (
+        select(heirs.c.role_id, inherited.c.inherited_role_id)
+        .select_from(heirs.join(inherited, true()))
+        .where(
+            heirs.c.inherited_role_id == role.id,
+            inherited.c.role_id == parent.id,
+            ~exists().where(
+                closure.c.role_id == heirs.c.role_id,
+                closure.c.inherited_role_id == inherited.c.inherited_role_id,
+            ),
+        )
+    )
+    db.execute(insert(closure).from_select(["role_id", "inherited_role_id"], rows))
+    db.commit()
+    db.refresh(role)
+    invalidate_catalog()
+    invalidate_user_permissions(get_role_user_ids(db, [role.id]))
     return role
+
+
+def remove_role_parent(db: Session, *, role: Role, parent: Role) -> Role:
+    """Stop the role from inheriting the permissions of the parent role."""
+    _lock_role_hierarchy(db, role.company_id)
+    affected_user_ids = get_role_user_ids(db, [role.id])
+    removed = db.execute(
+        delete(RoleParent).where(
+            RoleParent.role_id == role.id, RoleParent.parent_id == parent.id
+        )
+    ).rowcount
+    if not removed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Role does not inherit from this role",
+        )
+    _rebuild_closure(db, role.company_id, get_role_heir_ids(db, role.id))
+    db.commit()
+    db.refresh(role)
+    invalidate_catalog()
+    invalidate_user_permissions(affected_user_ids)
+    return role
+
+
+def _update_role_links(
+    db: Session,
+    role: Role,
+    link_model: Any,
+    member_key: str,
+    candidates: Select,
+    mode: LinkMode,
+) -> Dict[str, int]:
+    """
+    Add, remove or replace the links of a role in an association table with
+    one INSERT ... SELECT and/or one DELETE. candidates selects the ids of
+    the requested members that may be linked to the role.
+    """
+    link_role_id = link_model.role_id
+    link_member_id = getattr(link_model, member_key)
+    added = removed = 0
+
+    if mode != "add":
+        if mode == "remove":
+            stale = link_member_id.in_(candidates)
+        else:
+            stale = link_member_id.not_in(candidates)
+        removed = db.execute(
+            delete(link_model)
+            .where(link_role_id == role.id, stale)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if mode != "remove":
+        linked = select(link_member_id).where(link_role_id == role.id)
+        rows = candidates.add_columns(literal(role.id)).where(
+            candidates.selected_columns[0].not_in(linked)
+        )
+        added = db.execute(
+            insert(link_model).from_select([member_key, "role_id"], rows)
+        ).rowcount
+
+    return {"added": added, "removed": removed}
+
+
+def update_role_users(
+    db: Session, *, role: Role, user_ids: List[int], mode: LinkMode
+) -> Dict[str, int]:
+    """Add, remove or replace the users of a role. Only users of the role's
+    company can be assigned."""
+    previous = get_role_user_ids(db, [role.id]) if mode == "replace" else []
+    candidates = select(User.id).where(
+        User.id.in_(user_ids), User.company_id == role.company_id
+    )
+    result = _update_role_links(db, role, UserRole, "user_id", candidates, mode)
+    db.commit()
+    invalidate_user_permissions(set(user_ids).union(previous))
+    return result
+
+
+def update_role_permissions(
+    db: Session, *, role: Role, permission_ids: List[int], mode: LinkMode
+) -> Dict[str, int]:
+    """Add, remove or replace the permissions of a role."""
+    candidates = select(Permission.id).where(Permission.id.in_(permission_ids))
+    result = _update_role_links(
+        db, role, RolePermission, "permission_id", candidates, mode
+    )
+    db.commit()
+    if result["added"] or result["removed"]:
+        invalidate_catalog()
+        invalidate_tenant(role.company_id)
+        invalidate_user_permissions(get_role_user_ids(db, [role.id]))
+    return result
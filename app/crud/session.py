@@ -2,12 +2,87 @@ from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
 from sqlalchemy import and_, func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Query, Session
 
+from app.core.config import settings
 from app.models.sessions import Session as UserSession
 from app.models.user import User
 
 
+def live_sessions_window():
+    """
+    Sessions never outlive SESSION_EXPIRE_DAYS, so bounding created_at to
+    that window lets PostgreSQL prune older partitions of the sessions table.
+    """
+    return UserSession.created_at > datetime.now(timezone.utc) - timedelta(
+        days=settings.SESSION_EXPIRE_DAYS
+    )
+
+
+def get_session_expiry(created_at: datetime) -> datetime:
+    """Sliding expiry for a session used now, capped by its absolute lifetime."""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    sliding = datetime.now(timezone.utc) + timedelta(
+        days=settings.REFRESH_TOKEN_EXPIRE_DAYS
+    )
+    absolute = created_at + timedelta(days=settings.SESSION_EXPIRE_DAYS)
+    return min(sliding, absolute)
+
+
+def create_session(
+    db: Session,
+    *,
+    user_id: int,
+    refresh_token: str,
+    family_id: str,
+    device_info: Optional[str] = None,
+    ip_address: Optional[str] = None,
+) -> UserSession:
+    """
+    Create a session, evicting the user's oldest active sessions beyond
+    MAX_SESSIONS_PER_USER in the same transaction.
+    """
+    now = datetime.now(timezone.utc)
+
+    if settings.MAX_SESSIONS_PER_USER > 0:
+        # Lock the user row so concurrent logins evict one after another
+        db.query(User.id).filter(User.id == user_id).with_for_update().first()
+
+        evicted_ids = [
+            session_id
+            for (session_id,) in db.query(UserSession.id)
+            .filter(
+                and_(
+                    UserSession.user_id == user_id,
+                    UserSession.is_active == True,
+                    live_sessions_window(),
+                    UserSession.expires_at > now,
+                )
+            )
+            .order_by(UserSession.created_at.desc(), UserSession.id.desc())
+            .offset(settings.MAX_SESSIONS_PER_USER - 1)
+            .all()
+        ]
+        if evicted_ids:
+            db.query(UserSession).filter(UserSession.id.in_(evicted_ids)).update(
+                {UserSession.is_active: False}, synchronize_session=False
+            )
+
+    session = UserSession(
+        user_id=user_id,
+        refresh_token=refresh_token,
+        family_id=family_id,
+        device_info=device_info,
+        ip_address=ip_address,
+        created_at=now,
+        expires_at=get_session_expiry(now),
+    )
+    db.add(session)
+    db.commit()
+    return session
+
+
 def get_user_active_sessions(db: Session, user_id: int) -> List[UserSession]:
     """Get all active sessions for a specific user."""
     return (
@@ -16,6 +91,7 @@ def get_user_active_sessions(db: Session, user_id: int) -> List[UserSession]:
             and_(
                 UserSession.user_id == user_id,
                 UserSession.is_active == True,
+                live_sessions_window(),
                 UserSession.expires_at > datetime.now(timezone.utc),
             )
         )
@@ -35,6 +111,7 @@ def get_user_session_by_id(
                 UserSession.id == session_id,
                 UserSession.user_id == user_id,
                 UserSession.is_active == True,
+                live_sessions_window(),
             )
         )
         .first()
@@ -45,19 +122,24 @@ def get_session_by_id(db: Session, session_id: int) -> Optional[UserSession]:
     """Get a session by ID (admin function)."""
     return (
         db.query(UserSession)
-        .filter(and_(UserSession.id == session_id, UserSession.is_active == True))
+        .filter(
+            and_(
+                UserSession.id == session_id,
+                UserSession.is_active == True,
+                live_sessions_window(),
+            )
+        )
         .first()
     )
 
 
-def get_all_active_sessions(
-    db: Session, skip: int = 0, limit: int = 100, company_id: Optional[int] = None
-) -> List[UserSession]:
-    """Get all active sessions (admin function).
+def active_sessions_query(db: Session, company_id: Optional[int] = None) -> Query:
+    """Query of all active sessions, newest first.
     If company_id provided, filter by company."""
     query = db.query(UserSession).filter(
         and_(
             UserSession.is_active == True,
+            live_sessions_window(),
             UserSession.expires_at > datetime.now(timezone.utc),
         )
     )
@@ -65,14 +147,28 @@ def get_all_active_sessions(
     if company_id is not None:
         query = query.join(User).filter(User.company_id == company_id)
 
-    return query.order_by(UserSession.created_at.desc()).offset(skip).limit(limit).all()
+    return query.order_by(UserSession.created_at.desc())
+
+
+def get_all_active_sessions(
+    db: Session, skip: int = 0, limit: int = 100, company_id: Optional[int] = None
+) -> List[UserSession]:
+    """Get all active sessions (admin function).
+    If company_id provided, filter by company."""
+    return active_sessions_query(db, company_id).offset(skip).limit(limit).all()
 
 
 def get_current_user_session(db: Session, user_id: int) -> Optional[UserSession]:
     """Get current session for a user (used to exclude from revoke all)."""
     return (
         db.query(UserSession)
-        .filter(and_(UserSession.user_id == user_id, UserSession.is_active == True))
+        .filter(
+            and_(
+                UserSession.user_id == user_id,
+                UserSession.is_active == True,
+                live_sessions_window(),
+            )
+        )
         .first()
     )
 
@@ -86,51 +182,35 @@ def revoke_session(db: Session, session: UserSession) -> None:
 
 def get_session_statistics(db: Session, company_id: Optional[int] = None) -> dict:
     """
-    Get session statistics for admin dashboard.
+    Get session statistics for admin dashboard in a single scan.
     If company_id provided, filter by company.
     """
+    now = datetime.now(timezone.utc)
     # Active sessions in last 24 hours
-    last_24h = datetime.now(timezone.utc) - timedelta(hours=24)
+    recent = UserSession.created_at >= now - timedelta(hours=24)
 
-    query = db.query(UserSession).filter(
-        and_(
-            UserSession.is_active == True,
-            UserSession.created_at >= last_24h,
-            UserSession.expires_at > datetime.now(timezone.utc),
+    query = (
+        db.query(
+            func.count(UserSession.id).filter(recent),
+            func.count(func.distinct(UserSession.user_id)).filter(recent),
+            func.count(UserSession.id),
         )
-    )
-
-    if company_id is not None:
-        query = query.join(User).filter(User.company_id == company_id)
-
-    active_sessions_24h = query.count()
-
-    # Unique active users in last 24 hours
-    query = db.query(func.count(func.distinct(UserSession.user_id))).filter(
-        and_(
-            UserSession.is_active == True,
-            UserSession.created_at >= last_24h,
-            UserSession.expires_at > datetime.now(timezone.utc),
+        .select_from(UserSession)
+        .filter(
+            and_(
+                UserSession.is_active == True,
+                live_sessions_window(),
+                UserSession.expires_at > now,
+            )
         )
     )
 
     if company_id is not None:
-        query = query.join(User).filter(User.company_id == company_id)
-
-    active_users_24h = query.scalar()
-
-    # Total active sessions
-    query = db.query(UserSession).filter(
-        and_(
-            UserSession.is_active == True,
-            UserSession.expires_at > datetime.now(timezone.utc),
+        query = query.join(User, User.id == UserSession.user_id).filter(
+            User.company_id == company_id
         )
-    )
-
-    if company_id is not None:
-        query = query.join(User).filter(User.company_id == company_id)
 
-    total_active_sessions = query.count()
+    active_sessions_24h, active_users_24h, total_active_sessions = query.one()
 
     return {
         "active_sessions_24h": active_sessions_24h,
@@ -140,25 +220,52 @@ def get_session_statistics(db: Session, company_id: Optional[int] = None) -> dic
 
 
 def get_session_by_refresh_token(
-    db: Session, user_id: int, refresh_token: str
+    db: Session, user_id: int, refresh_token: str, for_update: bool = False
 ) -> Optional[UserSession]:
-    """Get session by refresh token for token refresh endpoint."""
+    """Get session by refresh token for token refresh endpoint.
+    With for_update, the row stays locked until commit so concurrent
+    refreshes of the same token are serialized."""
+    query = db.query(UserSession).filter(
+        UserSession.user_id == user_id,
+        UserSession.refresh_token == refresh_token,
+        UserSession.is_active == True,
+        live_sessions_window(),
+        UserSession.expires_at > datetime.now(timezone.utc),
+    )
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+
+def get_active_family_session(db: Session, family_id: str) -> Optional[UserSession]:
+    """Get the live session a refresh token family belongs to, if any."""
     return (
         db.query(UserSession)
         .filter(
-            UserSession.user_id == user_id,
-            UserSession.refresh_token == refresh_token,
+            UserSession.family_id == family_id,
             UserSession.is_active == True,
-            UserSession.expires_at > datetime.now(timezone.utc),
+            live_sessions_window(),
         )
         .first()
     )
 
 
+def revoke_session_family(db: Session, family_id: str) -> Optional[UserSession]:
+    """Revoke the session a refresh token family belongs to (reuse detected)."""
+    session = get_active_family_session(db, family_id=family_id)
+    if session:
+        revoke_session(db, session)
+    return session
+
+
 def get_user_sessions_for_logout(db: Session, user_id: int) -> Optional[UserSession]:
     """Get user session for logout endpoint."""
     return (
         db.query(UserSession)
-        .filter(UserSession.user_id == user_id, UserSession.is_active == True)
+        .filter(
+            UserSession.user_id == user_id,
+            UserSession.is_active == True,
+            live_sessions_window(),
+        )
         .first()
     )
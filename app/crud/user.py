@@ -1,12 +1,31 @@
 import secrets
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query, Session
 
+from app.core.cache import LRUCache
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.metrics import Counter
+from app.core.redis import (
+    cache_principal,
+    delete_cached_principals,
+    get_cached_principal,
+)
+from app.core.security import get_password_hash, hash_passwords
+from app.crud.permission import (
+    UserGrants,
+    cache_user_grants,
+    get_cached_user_grants,
+    get_user_grants,
+    invalidate_user_permissions,
+)
+from app.models.company import Company
+from app.models.permissions import Permission
+from app.models.roles import Role, RoleClosure, RolePermission, UserRole
 from app.models.user import PasswordResetToken, User
 from app.schemas.user import UserCreate, UserUpdate
 
@@ -23,6 +42,169 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
 
+class UserSnapshot(NamedTuple):
+    """Identity and status of a user, as cached for authentication"""
+
+    id: int
+    company_id: int
+    is_active: bool
+    is_superuser: bool
+
+
+class AuthContext(NamedTuple):
+    """
+    Immutable, session-detached view of the authenticated user and their
+    grants in their company, used on the request path instead of a User.
+    """
+
+    id: int
+    company_id: int
+    is_active: bool
+    is_superuser: bool
+    role_ids: FrozenSet[int]
+    permissions: FrozenSet[str]
+
+
+# user_id -> UserSnapshot; bounds cross-process staleness
+_local_principals = LRUCache(
+    maxsize=settings.PRINCIPAL_CACHE_LOCAL_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL_SECONDS,
+)
+principal_cache_lookups = Counter("principal_cache_lookups")
+
+
+def _cache_user_snapshot(snapshot: UserSnapshot) -> None:
+    cache_principal(
+        snapshot.id, snapshot._asdict(), settings.PRINCIPAL_CACHE_TTL_SECONDS
+    )
+    _local_principals.set(snapshot.id, snapshot)
+
+
+def get_cached_user_snapshot(user_id: int) -> Optional[UserSnapshot]:
+    """Get a user's snapshot from the in-process cache, then Redis."""
+    snapshot = _local_principals.get(user_id)
+    if snapshot is not None:
+        principal_cache_lookups.inc("local_hit")
+        return snapshot
+
+    cached = get_cached_principal(user_id)
+    if cached is None:
+        principal_cache_lookups.inc("miss")
+        return None
+    principal_cache_lookups.inc("redis_hit")
+    snapshot = UserSnapshot(**cached)
+    _local_principals.set(user_id, snapshot)
+    return snapshot
+
+
+def _load_user_snapshot(db: Session, user_id: int) -> Optional[UserSnapshot]:
+    row = (
+        db.query(User.id, User.company_id, User.is_active, User.is_superuser)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    snapshot = UserSnapshot(*row)
+    _cache_user_snapshot(snapshot)
+    return snapshot
+
+
+def get_user_snapshot(db: Session, user_id: int) -> Optional[UserSnapshot]:
+    """Get a user's identity and status, served from cache when possible."""
+    snapshot = get_cached_user_snapshot(user_id)
+    if snapshot is not None:
+        return snapshot
+    return _load_user_snapshot(db, user_id)
+
+
+def get_principal_cache_stats() -> Dict[str, Any]:
+    """Lookup counts and hit ratio of the principal cache, and its staleness bound"""
+    lookups = principal_cache_lookups.snapshot()
+    total = sum(lookups.values())
+    hits = lookups.get("local_hit", 0) + lookups.get("redis_hit", 0)
+    return {
+        "lookups": lookups,
+        "hit_ratio": hits / total if total else 0.0,
+        "max_staleness_seconds": settings.PRINCIPAL_CACHE_LOCAL_TTL_SECONDS,
+    }
+
+
+def invalidate_user_snapshots(user_ids: Iterable[int]) -> None:
+    """Drop the cached snapshots of the given users."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    delete_cached_principals(user_ids)
+    for user_id in user_ids:
+        _local_principals.delete(user_id)
+
+
+def get_auth_context(db: Session, user_id: int) -> Optional[AuthContext]:
+    """
+    Get a user together with their roles and permission names. Cached parts
+    are reused; when nothing is cached everything is loaded in one query.
+    """
+    snapshot = get_cached_user_snapshot(user_id)
+    cached_grants = get_cached_user_grants(user_id)
+
+    if snapshot is None and cached_grants is None:
+        rows = (
+            db.query(
+                User.id,
+                User.company_id,
+                User.is_active,
+                User.is_superuser,
+                Role.id,
+                Permission.name,
+            )
+            .outerjoin(UserRole, UserRole.user_id == User.id)
+            .outerjoin(
+                Role,
+                and_(Role.id == UserRole.role_id, Role.company_id == User.company_id),
+            )
+            .outerjoin(RoleClosure, RoleClosure.role_id == Role.id)
+            .outerjoin(
+                RolePermission,
+                RolePermission.role_id == RoleClosure.inherited_role_id,
+            )
+            .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+            .filter(User.id == user_id)
+            .all()
+        )
+        if not rows:
+            return None
+        snapshot = UserSnapshot(*rows[0][:4])
+        grants = UserGrants(
+            role_ids=frozenset(row[4] for row in rows if row[4] is not None),
+            permissions=frozenset(row[5] for row in rows if row[5] is not None),
+        )
+        _cache_user_snapshot(snapshot)
+        cache_user_grants(snapshot.id, snapshot.company_id, grants)
+        return AuthContext(*snapshot, grants.role_ids, grants.permissions)
+
+    if snapshot is None:
+        snapshot = _load_user_snapshot(db, user_id)
+        if snapshot is None:
+            return None
+    if cached_grants is not None and cached_grants[0] == snapshot.company_id:
+        grants = cached_grants[1]
+    else:
+        grants = get_user_grants(db, snapshot)
+    return AuthContext(*snapshot, grants.role_ids, grants.permissions)
+
+
+def get_users_by_ids(
+    db: Session, user_ids: Iterable[int], company_id: int
+) -> List[User]:
+    """Get the users of a company among the given ids, in one query."""
+    return (
+        db.query(User)
+        .filter(User.id.in_(set(user_ids)), User.company_id == company_id)
+        .all()
+    )
+
+
 def get_by_email_or_username(
     db: Session, *, email: str, username: str
 ) -> Optional[User]:
@@ -33,14 +215,9 @@ def get_by_email_or_username(
     )
 
 
-def get_users(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
-    current_user: Optional[User] = None,
-) -> List[User]:
+def users_query(db: Session, current_user: Optional[User] = None) -> Query:
     """
-    Get users based on user permissions
+    Query of the users visible to current_user
     - Superusers from root company see all users
     - Superusers from other companies see only users in their company
     - Regular users see only themselves
@@ -49,23 +226,48 @@ def get_users(
 
     # If no current user specified, return all users (admin endpoint)
     if not current_user:
-        return query.offset(skip).limit(limit).all()
+        return query
 
     # Current user is provided
     if current_user.is_superuser:
         # Check if user is from root company
-        from app.crud.company import get_root_company
-
-        root_company = get_root_company(db)
+        from app.crud.company import is_root_user
 
-        if current_user.company_id != root_company.id:
+        if not is_root_user(db, current_user):
             # Non-root superusers can only see users from their company
             query = query.filter(User.company_id == current_user.company_id)
     else:
         # Regular users can only see themselves
         query = query.filter(User.id == current_user.id)
 
-    return query.offset(skip).limit(limit).all()
+    return query
+
+
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    current_user: Optional[User] = None,
+) -> List[User]:
+    """Get users based on user permissions, see users_query"""
+    return users_query(db, current_user).offset(skip).limit(limit).all()
+
+
+def get_user_statistics(db: Session, company_id: Optional[int] = None) -> dict:
+    """
+    Get active user count and users registered in the last 7 days in one scan.
+    If company_id provided, filter by company.
+    """
+    last_7d = datetime.now(timezone.utc) - timedelta(days=7)
+    query = db.query(
+        func.count(User.id).filter(User.is_active == True),
+        func.count(User.id).filter(User.created_at >= last_7d),
+    )
+    if company_id is not None:
+        query = query.filter(User.company_id == company_id)
+
+    total_users, new_users_7d = query.one()
+    return {"total_users": total_users, "new_users_7d": new_users_7d}
 
 
 def create_user(
@@ -98,6 +300,150 @@ def create_user(
     return db_obj
 
 
+def _describe_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+def _insert_ignoring_conflicts(db: Session, rows: List[Dict[str, Any]]):
+    """Multi-row INSERT that skips rows violating a unique constraint"""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(User).values(rows).on_conflict_do_nothing()
+
+
+ImportCandidates = List[Tuple[int, UserCreate]]
+ImportErrors = List[Dict[str, Any]]
+
+
+def _validate_import_rows(
+    rows: Iterable[Any], company_id: int, own_company_only: bool, errors: ImportErrors
+) -> ImportCandidates:
+    """Validate rows on their own and against each other"""
+    candidates: ImportCandidates = []
+    seen_emails: Dict[str, int] = {}
+    seen_usernames: Dict[str, int] = {}
+
+    for number, raw in enumerate(rows, start=1):
+        if number > settings.IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"An import can hold at most {settings.IMPORT_MAX_ROWS} rows",
+            )
+        if not isinstance(raw, dict):
+            errors.append({"row": number, "detail": "Row is not a JSON object"})
+            continue
+        try:
+            user_in = UserCreate.model_validate({"company_id": company_id, **raw})
+        except ValidationError as e:
+            errors.append({"row": number, "detail": _describe_validation_error(e)})
+            continue
+        if own_company_only and user_in.company_id != company_id:
+            detail = "You can only create users in your own company"
+            errors.append({"row": number, "detail": detail})
+            continue
+        first = seen_emails.get(user_in.email) or seen_usernames.get(user_in.username)
+        if first:
+            detail = f"Duplicate of row {first} in this import"
+            errors.append({"row": number, "detail": detail})
+            continue
+        seen_emails[user_in.email] = number
+        seen_usernames[user_in.username] = number
+        candidates.append((number, user_in))
+    return candidates
+
+
+def _exclude_existing(
+    db: Session, candidates: ImportCandidates, errors: ImportErrors
+) -> ImportCandidates:
+    """Check target companies and uniqueness for all rows with one query each"""
+    if not candidates:
+        return candidates
+    company_ids = {user_in.company_id for _, user_in in candidates}
+    known_companies = {
+        id for (id,) in db.query(Company.id).filter(Company.id.in_(company_ids))
+    }
+    taken = db.query(User.email, User.username).filter(
+        or_(
+            User.email.in_([user_in.email for _, user_in in candidates]),
+            User.username.in_([user_in.username for _, user_in in candidates]),
+        )
+    )
+    taken_emails, taken_usernames = set(), set()
+    for email, username in taken:
+        taken_emails.add(email)
+        taken_usernames.add(username)
+
+    valid = []
+    for number, user_in in candidates:
+        if user_in.company_id not in known_companies:
+            detail = f"Company with id {user_in.company_id} not found"
+        elif user_in.email in taken_emails:
+            detail = "The user with this email already exists in the system."
+        elif user_in.username in taken_usernames:
+            detail = "The user with this username already exists in the system."
+        else:
+            valid.append((number, user_in))
+            continue
+        errors.append({"row": number, "detail": detail})
+    return valid
+
+
+def _insert_users(
+    db: Session, candidates: ImportCandidates, errors: ImportErrors
+) -> int:
+    """Hash passwords in parallel and insert rows in multi-row statements"""
+    hashed = hash_passwords([user_in.password for _, user_in in candidates])
+    created = 0
+    batch_size = settings.IMPORT_BATCH_SIZE
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start : start + batch_size]
+        values = []
+        for (_, user_in), hashed_password in zip(
+            batch, hashed[start : start + batch_size]
+        ):
+            data = user_in.model_dump(exclude={"password"})
+            data["hashed_password"] = hashed_password
+            values.append(data)
+        statement = _insert_ignoring_conflicts(db, values).returning(User.username)
+        inserted = {username for (username,) in db.execute(statement)}
+        created += len(inserted)
+        # Rows taken concurrently since the uniqueness check
+        for number, user_in in batch:
+            if user_in.username not in inserted:
+                detail = "The user with this email or username already exists."
+                errors.append({"row": number, "detail": detail})
+    return created
+
+
+def import_users(
+    db: Session,
+    *,
+    rows: Iterable[Any],
+    company_id: int,
+    own_company_only: bool,
+) -> Dict[str, Any]:
+    """
+    Create users in bulk. Every row is validated as a UserCreate (company_id
+    defaults to company_id), uniqueness is checked for all rows with one
+    query, passwords are hashed in parallel and rows are inserted in
+    multi-row statements. Rows that cannot be created are reported with
+    their 1-based position instead of failing the import.
+    """
+    errors: ImportErrors = []
+    candidates = _validate_import_rows(rows, company_id, own_company_only, errors)
+    candidates = _exclude_existing(db, candidates, errors)
+    created = _insert_users(db, candidates, errors)
+    db.commit()
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "errors": errors}
+
+
 def update_user(
     db: Session, *, db_obj: User, obj_in: UserUpdate | Dict[str, Any]
 ) -> User:
@@ -122,6 +468,11 @@ def update_user(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_user_snapshots([db_obj.id])
+
+    if "company_id" in update_data:
+        # Effective permissions are scoped to the user's company
+        invalidate_user_permissions([db_obj.id])
     return db_obj
 
 
@@ -130,6 +481,8 @@ def delete_user(db: Session, *, user_id: int) -> Optional[User]:
     if user:
         db.delete(user)
         db.commit()
+        invalidate_user_snapshots([user_id])
+        invalidate_user_permissions([user_id])
     return user
 
 
@@ -179,3 +532,4 @@ def reset_password(
     db.add(user)
     db.add(token_obj)
     db.commit()
+    invalidate_user_snapshots([user.id])
@@ -0,0 +1,155 @@
+"""
+Maintenance of range-partitioned tables (PostgreSQL only).
+
+Tables listed in PARTITIONED_TABLES are partitioned by month on a
+timestamp column. Partitions are named ``<table>_pYYYYMM``; future ones are
+created ahead of time and those entirely past retention are detached and
+dropped, which is far cheaper than deleting their rows. A DEFAULT partition,
+``<table>_default``, takes rows no monthly partition covers yet, so inserts
+keep working when maintenance falls behind; creating the month's partition
+later moves its rows out of it.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Table name -> partition key column
+PARTITIONED_TABLES = {"sessions": "created_at"}
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month_index = value.year * 12 + value.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def partition_start(table: str, name: str) -> datetime:
+    """Inverse of partition_name"""
+    return datetime.strptime(name[len(table) + 2 :], "%Y%m")
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def create_default_partition(connection: Connection, table: str) -> str:
+    name = default_partition_name(table)
+    connection.execute(
+        text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} DEFAULT")
+    )
+    return name
+
+
+def create_partition(connection: Connection, table: str, start: datetime) -> str:
+    """
+    Create the monthly partition of table starting at start, if missing.
+    Rows of that month already in the DEFAULT partition are moved into it:
+    the partition is filled as a plain table and then attached, as
+    PostgreSQL refuses to add a partition whose rows the default holds.
+    The default partition stays locked until the transaction ends, so no
+    row of the month can reach it between the move and the attach.
+    """
+    name = partition_name(table, start)
+    if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return name
+
+    end = add_months(start, 1)
+    column = PARTITIONED_TABLES[table]
+    default = default_partition_name(table)
+    in_month = f"{column} >= '{start:%Y-%m-%d}' AND {column} < '{end:%Y-%m-%d}'"
+    connection.execute(text(f"LOCK TABLE {default} IN ACCESS EXCLUSIVE MODE"))
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    connection.execute(
+        text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_month}")
+    )
+    connection.execute(text(f"DELETE FROM {default} WHERE {in_month}"))
+    connection.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+    )
+    return name
+
+
+def create_partitions(
+    connection: Connection, table: str, first: datetime, last: datetime
+) -> List[str]:
+    """Create monthly partitions covering first through last"""
+    created = []
+    start = month_start(first)
+    while start <= last:
+        created.append(create_partition(connection, table, start))
+        start = add_months(start, 1)
+    return created
+
+
+def list_partitions(connection: Connection, table: str) -> List[Tuple[str, datetime]]:
+    rows = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :table ORDER BY child.relname"
+        ),
+        {"table": table},
+    ).scalars()
+    # The DEFAULT partition covers no month and is never dropped
+    default = default_partition_name(table)
+    return [(name, partition_start(table, name)) for name in rows if name != default]
+
+
+def retention_cutoff(table: str) -> datetime:
+    """Partitions ending at or before this point may be dropped"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = add_months(month_start(now), -settings.PARTITION_RETENTION_MONTHS)
+    if table == "sessions":
+        # Never drop a partition that may still hold a live session
+        cutoff = min(cutoff, now - timedelta(days=settings.SESSION_EXPIRE_DAYS))
+    return cutoff
+
+
+def drop_expired_partitions(connection: Connection, table: str) -> List[str]:
+    """Detach and drop partitions of table that are past retention"""
+    cutoff = retention_cutoff(table)
+    dropped = []
+    for name, start in list_partitions(connection, table):
+        if add_months(start, 1) > cutoff:
+            continue
+        connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        connection.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(connection: Connection) -> None:
+    """Pre-create upcoming partitions and drop expired ones for every table"""
+    if connection.dialect.name != "postgresql":
+        return
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    last = add_months(month_start(now), settings.PARTITION_PREMAKE_MONTHS)
+    connection.execute(
+        text(f"SET LOCAL lock_timeout = {int(settings.CLEANUP_LOCK_TIMEOUT_MS)}")
+    )
+    for table in PARTITIONED_TABLES:
+        create_default_partition(connection, table)
+        create_partitions(connection, table, now, last)
+        dropped = drop_expired_partitions(connection, table)
+        if dropped:
+            logger.info(f"Dropped partitions of {table}: {', '.join(dropped)}")
@@ -0,0 +1,220 @@
+"""
+Periodic purge of expired sessions and used one-time tokens, plus
+maintenance of partitioned tables.
+
+Rows are deleted in small keyset-ordered batches, each in its own short
+transaction with a lock timeout, throttled between batches so the purge
+never holds long locks on the hot tables. On PostgreSQL a session-level
+advisory lock lets only one process run the cleanup at a time, so every
+worker can schedule it.
+
+Run once from the command line with ``python -m app.jobs.cleanup``.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator
+
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.db import session as db_session
+from app.db.partitions import maintain_partitions
+from app.models.sessions import Session as UserSession
+from app.models.user import EmailVerificationToken, PasswordResetToken
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key held by the process running the cleanup
+CLEANUP_LOCK_KEY = 7_264_001
+
+cleanup_duration = {
+    table: Histogram(f"cleanup_{table}_duration_seconds")
+    for table in ("sessions", "password_reset_tokens", "email_verification_tokens")
+}
+
+
+def purge_in_batches(
+    db: Session,
+    model,
+    condition,
+    *,
+    batch_size: int,
+    lock_timeout_ms: int,
+    throttle_seconds: float,
+) -> int:
+    """
+    Delete rows of model matching condition in keyset-ordered batches.
+
+    Args:
+        db: Database session
+        model: Mapped class with an integer ``id`` primary key
+        condition: WHERE clause selecting the rows to delete
+        batch_size: Number of rows deleted per transaction
+        lock_timeout_ms: Lock timeout for each batch (PostgreSQL only)
+        throttle_seconds: Pause between batches
+
+    Returns:
+        The number of rows deleted
+    """
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    deleted = 0
+    last_id = 0
+
+    while True:
+        batch_ids = db.scalars(
+            select(model.id)
+            .where(condition, model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not batch_ids:
+            db.commit()
+            break
+
+        last_id = batch_ids[-1]
+        try:
+            if is_postgres:
+                db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+            result = db.execute(delete(model).where(model.id.in_(batch_ids)))
+            db.commit()
+            deleted += result.rowcount
+        except OperationalError as e:
+            # Rows locked by live traffic are left for the next run
+            db.rollback()
+            logger.warning(f"Skipped batch in {model.__tablename__}: {e}")
+
+        if len(batch_ids) < batch_size:
+            break
+        time.sleep(throttle_seconds)
+
+    return deleted
+
+
+@contextmanager
+def _cleanup_lock(engine: Engine) -> Iterator[bool]:
+    """
+    Whether this process holds the cleanup lock, always the case off
+    PostgreSQL. The lock is held on its own connection, outside of any
+    transaction, and released when the block exits.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    with engine.connect() as connection:
+        acquired = connection.scalar(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": CLEANUP_LOCK_KEY}
+        )
+        connection.commit()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                try:
+                    connection.execute(
+                        text("SELECT pg_advisory_unlock(:key)"),
+                        {"key": CLEANUP_LOCK_KEY},
+                    )
+                    connection.commit()
+                except Exception:
+                    # Closing the backend releases the lock instead
+                    connection.invalidate()
+                    raise
+
+
+def run_cleanup(db: Session) -> Dict[str, int]:
+    """
+    Purge every table once and return the rows removed per table. Nothing
+    is done while another process runs the cleanup.
+    """
+    with _cleanup_lock(db.get_bind()) as acquired:
+        if not acquired:
+            logger.info("Cleanup is running in another process, skipped")
+            return {}
+        return _run_cleanup(db)
+
+
+def _run_cleanup(db: Session) -> Dict[str, int]:
+    try:
+        maintain_partitions(db.connection())
+        db.commit()
+    except Exception:
+        # The purge does not depend on partition maintenance
+        db.rollback()
+        logger.exception("Skipped partition maintenance")
+
+    now = datetime.now(timezone.utc)
+    targets = {
+        "sessions": (
+            UserSession,
+            or_(UserSession.is_active == False, UserSession.expires_at < now),
+        ),
+        "password_reset_tokens": (
+            PasswordResetToken,
+            or_(
+                PasswordResetToken.is_used == True, PasswordResetToken.expires_at < now
+            ),
+        ),
+        "email_verification_tokens": (
+            EmailVerificationToken,
+            or_(
+                EmailVerificationToken.is_used == True,
+                EmailVerificationToken.expires_at < now,
+            ),
+        ),
+    }
+
+    removed = {}
+    for table, (model, condition) in targets.items():
+        start_time = time.time()
+        removed[table] = purge_in_batches(
+            db,
+            model,
+            condition,
+            batch_size=settings.CLEANUP_BATCH_SIZE,
+            lock_timeout_ms=settings.CLEANUP_LOCK_TIMEOUT_MS,
+            throttle_seconds=settings.CLEANUP_THROTTLE_SECONDS,
+        )
+        elapsed = time.time() - start_time
+        cleanup_duration[table].observe(elapsed)
+        logger.info(f"Removed {removed[table]} rows from {table} in {elapsed:.2f}s")
+
+    logger.info(
+        "Cleanup duration histograms: "
+        + ", ".join(
+            f"{table}={histogram.snapshot()['buckets']}"
+            for table, histogram in cleanup_duration.items()
+        )
+    )
+    return removed
+
+
+def run_cleanup_once() -> Dict[str, int]:
+    db = db_session.SessionLocal()
+    try:
+        return run_cleanup(db)
+    finally:
+        db.close()
+
+
+async def run_cleanup_periodically(interval_seconds: int) -> None:
+    """Run the cleanup every interval_seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(run_cleanup_once)
+        except Exception:
+            logger.exception("Cleanup run failed")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_cleanup_once()
@@ -1,15 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from app.api.v1.endpoints import auth, companies, integrations, permissions
+from app.api.middlewares.auth_context import AuthContextMiddleware
+from app.api.v1.endpoints import auth, authz, companies, integrations, permissions
 from app.api.v1.endpoints import resources as resources_router
 from app.api.v1.endpoints import roles, sessions, users, webhooks
 from app.core.config import settings
+from app.core.security import start_password_hash_pool, stop_password_hash_pool
+from app.jobs.cleanup import run_cleanup_periodically
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cleanup_task = None
+    if settings.CLEANUP_INTERVAL_SECONDS > 0:
+        cleanup_task = asyncio.create_task(
+            run_cleanup_periodically(settings.CLEANUP_INTERVAL_SECONDS)
+        )
+    start_password_hash_pool()
+    yield
+    stop_password_hash_pool()
+    if cleanup_task:
+        cleanup_task.cancel()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Set all CORS enabled origins
@@ -21,6 +45,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.AUTH_MIDDLEWARE_ENABLED:
+    app.add_middleware(AuthContextMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
@@ -53,6 +80,7 @@ app.include_router(
     prefix=f"{settings.API_V1_STR}/webhooks",
     tags=["webhooks"],
 )
+app.include_router(authz.router, prefix=f"{settings.API_V1_STR}/authz", tags=["authz"])
 
 
 @app.get("/")
@@ -12,7 +12,9 @@ class Integration(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    api_key = Column(String, unique=True, index=True, nullable=False)
+    # API keys are "<prefix>.<secret>"; only the prefix and a hash are stored
+    api_key_prefix = Column(String, unique=True, index=True, nullable=False)
+    api_key_hash = Column(String, nullable=False)
     api_secret = Column(String, nullable=False)
     integration_type = Column(String, nullable=False)  # "oauth2", "api_key", etc.
     configuration = Column(JSON, nullable=True)  # Specific configuration
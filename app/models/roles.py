@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, event
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import CustomBase as Base
@@ -18,6 +18,36 @@ class RolePermission(Base):
     permission_id = Column(Integer, ForeignKey("permissions.id"), primary_key=True)
 
 
+class RoleParent(Base):
+    """A role inherits the permissions of its parent roles"""
+
+    __tablename__ = "role_parent"
+    role_id = Column(
+        Integer, ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    parent_id = Column(
+        Integer, ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True
+    )
+
+
+class RoleClosure(Base):
+    """
+    Transitive closure of role_parent, including every role itself: role_id
+    inherits the permissions of inherited_role_id. Maintained by crud.role.
+    """
+
+    __tablename__ = "role_closure"
+    role_id = Column(
+        Integer, ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    inherited_role_id = Column(
+        Integer,
+        ForeignKey("roles.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+
 class Role(Base):
     __tablename__ = "roles"
 
@@ -39,3 +69,24 @@ class Role(Base):
         "Permission", secondary="role_permission", back_populates="roles"
     )
     company = relationship("Company", back_populates="roles")
+    parents = relationship(
+        "Role",
+        secondary="role_parent",
+        primaryjoin="Role.id == RoleParent.role_id",
+        secondaryjoin="Role.id == RoleParent.parent_id",
+        viewonly=True,
+    )
+
+    @property
+    def parent_ids(self) -> list:
+        return [parent.id for parent in self.parents]
+
+
+@event.listens_for(Role, "after_insert")
+def _add_closure_self_row(mapper, connection, target: Role) -> None:
+    # Every role inherits itself, so effective permissions are one join
+    connection.execute(
+        RoleClosure.__table__.insert().values(
+            role_id=target.id, inherited_role_id=target.id
+        )
+    )
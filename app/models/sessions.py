@@ -1,22 +1,38 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import CustomBase as Base
 
 
 class Session(Base):
+    # In PostgreSQL this table is range-partitioned by month on created_at
+    # (see app/db/partitions.py): its primary key is (id, created_at) and
+    # unique constraints cannot span partitions.
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Serves the per-user active session lookups
+        Index("ix_sessions_user_active", "user_id", "is_active", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    refresh_token = Column(String, unique=True, index=True)
+    refresh_token = Column(String, index=True)
+    # Shared by every refresh token rotated from the same login
+    family_id = Column(String, index=True, nullable=True)
     device_info = Column(String)
     ip_address = Column(String)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
     expires_at = Column(DateTime, nullable=False)
     is_active = Column(Boolean, default=True)
 
     # Relationships
     user = relationship("User", back_populates="sessions")
+
+    # Same identity as the partitioned table's primary key. The table itself
+    # keeps id as its key so databases without partitioning (SQLite) still
+    # generate it; PostgreSQL's key comes from the partitioning migration.
+    __mapper_args__ = {"primary_key": [id, created_at]}
@@ -0,0 +1,18 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class AuthzCheck(BaseModel):
+    subject: int
+    permission: str
+    resource: Optional[str] = None
+
+
+class AuthzCheckRequest(BaseModel):
+    checks: List[AuthzCheck]
+
+
+class AuthzCheckResponse(BaseModel):
+    # One decision per check, in request order
+    results: List[bool]
@@ -30,7 +30,7 @@ class IntegrationUpdate(BaseModel):
 # Properties shared by models stored in DB
 class IntegrationInDBBase(IntegrationBase):
     id: int
-    api_key: str
+    api_key_prefix: str
     is_active: bool
     created_at: datetime
     updated_at: datetime
@@ -44,6 +44,12 @@ class Integration(IntegrationInDBBase):
     pass
 
 
+# Returned once, on creation: the full API key is not stored
+class IntegrationWithKey(Integration):
+    api_key: str
+
+
 # Additional properties stored in DB, not returned to client
 class IntegrationInDB(IntegrationInDBBase):
+    api_key_hash: str
     api_secret: str
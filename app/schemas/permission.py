@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import AliasPath, BaseModel, ConfigDict, Field
 
 
 # Permission schemas
@@ -27,3 +27,11 @@ class Permission(PermissionBase):
     resource: Optional[str] = None  # This will be populated from resource_type.name
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# Permission as listed and cached by crud.permission, its resource read
+# from resource_type.name
+class PermissionListing(Permission):
+    resource: Optional[str] = Field(
+        default=None, validation_alias=AliasPath("resource_type", "name")
+    )
@@ -1,9 +1,10 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
-from app.schemas.permission import Permission
+from app.schemas.permission import Permission, PermissionBase, PermissionListing
+from app.schemas.resource import ResourceType
 
 
 # Role schemas
@@ -33,3 +34,44 @@ class Role(RoleBase):
 # Role with permissions schema
 class RoleWithPermissions(Role):
     permissions: List[Permission] = []
+
+
+# Role listing as cached by crud.role.get_roles, shaped like RoleWithPermissions
+class RoleListing(Role):
+    permissions: List[PermissionListing] = []
+
+
+# Role with the roles it inherits permissions from
+class RoleWithParents(Role):
+    parent_ids: List[int] = []
+
+
+# Normalized role listing: permissions and resource types are listed once
+class RoleWithPermissionIds(Role):
+    permission_ids: List[int] = []
+
+
+class PermissionEntry(PermissionBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class RoleCatalog(BaseModel):
+    roles: List[RoleWithPermissionIds]
+    permissions: Dict[int, PermissionEntry]
+    resource_types: Dict[int, ResourceType]
+
+
+# Bulk changes to the users or permissions of a role
+class RoleUsersUpdate(BaseModel):
+    user_ids: List[int]
+
+
+class RolePermissionsUpdate(BaseModel):
+    permission_ids: List[int]
+
+
+class RoleLinksResult(BaseModel):
+    added: int
+    removed: int
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Annotated, Optional
+from typing import Annotated, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
@@ -25,6 +25,17 @@ class UserCreate(UserBase):
     is_active: bool = True
 
 
+# Outcome of a bulk import: rows are numbered from 1 in file order
+class UserImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class UserImportResult(BaseModel):
+    created: int
+    errors: List[UserImportError]
+
+
 # Properties to receive via API on update
 class UserUpdate(UserBase):
     password: Optional[Annotated[str, Field(min_length=8)]] = None
@@ -85,3 +96,17 @@ class ActiveUsersStats(BaseModel):
     total_active_sessions: int
     total_users: int
     new_users_7d: int
+
+
+class ActivityStats(BaseModel):
+    active_users_24h: int
+    active_users_7d: int
+    active_users_30d: int
+    logins_per_hour: List[int]
+    refreshes_per_hour: List[int]
+
+
+class PrincipalCacheStats(BaseModel):
+    lookups: Dict[str, int]
+    hit_ratio: float
+    max_staleness_seconds: float
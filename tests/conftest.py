@@ -114,10 +114,14 @@ def client():
         
         # Import app and dependencies
         from app.main import app
+        from app.core.cache import clear_local_caches
+        clear_local_caches()
         from app.db.session import get_db
+        from app.api.deps import get_session_factory
         
         # Override the database dependency to use SQLite
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_session_factory] = lambda: TestSessionLocal
         
         # Import models and create tables
         from app.models import user, resource, sessions, company, roles, permissions
@@ -225,6 +229,15 @@ def db():
     Base.metadata.drop_all(bind=test_engine)
 
 
+def login(client, username="root", password="Root1234!"):
+    """Log in through the API and return the token response."""
+    response = client.post(
+        "/api/v1/auth/login", data={"username": username, "password": password}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
 @pytest.fixture(scope="function")
 def root_token(client):
     """Get authentication token for root user."""
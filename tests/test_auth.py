@@ -1,8 +1,11 @@
 import pytest
+from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
 
+from tests.conftest import login
 
-@pytest.mark.integration  
+
+@pytest.mark.integration
 def test_register_user(client: TestClient, auth_headers):
     """Test user registration by authenticated superuser."""
     user_data = {
@@ -10,9 +13,9 @@ def test_register_user(client: TestClient, auth_headers):
         "username": "testuser",
         "password": "testpassword123",
         "full_name": "Test User",
-        "company_id": 1  # Root company ID
+        "company_id": 1,  # Root company ID
     }
-    
+
     response = client.post("/api/v1/users/", json=user_data, headers=auth_headers)
     assert response.status_code == 200
     data = response.json()
@@ -33,18 +36,17 @@ def test_login_user(client: TestClient, auth_headers):
         "username": "loginuser",
         "password": "loginpassword123",
         "full_name": "Login User",
-        "company_id": 1  # Root company ID
+        "company_id": 1,  # Root company ID
     }
-    
-    register_response = client.post("/api/v1/users/", json=user_data, headers=auth_headers)
+
+    register_response = client.post(
+        "/api/v1/users/", json=user_data, headers=auth_headers
+    )
     assert register_response.status_code == 200
-    
+
     # Now try to login
-    login_data = {
-        "username": "loginuser",
-        "password": "loginpassword123"
-    }
-    
+    login_data = {"username": "loginuser", "password": "loginpassword123"}
+
     response = client.post("/api/v1/auth/login", data=login_data)
     assert response.status_code == 200
     data = response.json()
@@ -62,18 +64,17 @@ def test_login_with_wrong_password(client: TestClient, auth_headers):
         "username": "wronguser",
         "password": "correctpassword123",
         "full_name": "Wrong User",
-        "company_id": 1  # Root company ID
+        "company_id": 1,  # Root company ID
     }
-    
-    register_response = client.post("/api/v1/users/", json=user_data, headers=auth_headers)
+
+    register_response = client.post(
+        "/api/v1/users/", json=user_data, headers=auth_headers
+    )
     assert register_response.status_code == 200
-    
+
     # Try to login with wrong password
-    login_data = {
-        "username": "wronguser",
-        "password": "wrongpassword"
-    }
-    
+    login_data = {"username": "wronguser", "password": "wrongpassword"}
+
     response = client.post("/api/v1/auth/login", data=login_data)
     assert response.status_code == 401
     data = response.json()
@@ -83,11 +84,8 @@ def test_login_with_wrong_password(client: TestClient, auth_headers):
 @pytest.mark.integration
 def test_login_nonexistent_user(client: TestClient):
     """Test login with nonexistent user."""
-    login_data = {
-        "username": "nonexistent",
-        "password": "anypassword"
-    }
-    
+    login_data = {"username": "nonexistent", "password": "anypassword"}
+
     response = client.post("/api/v1/auth/login", data=login_data)
     assert response.status_code == 401
     data = response.json()
@@ -103,17 +101,17 @@ def test_password_reset_request(client: TestClient, auth_headers):
         "username": "resetuser",
         "password": "resetpassword123",
         "full_name": "Reset User",
-        "company_id": 1  # Root company ID
+        "company_id": 1,  # Root company ID
     }
-    
-    register_response = client.post("/api/v1/users/", json=user_data, headers=auth_headers)
+
+    register_response = client.post(
+        "/api/v1/users/", json=user_data, headers=auth_headers
+    )
     assert register_response.status_code == 200
-    
+
     # Request password reset
-    reset_data = {
-        "email": "reset@example.com"
-    }
-    
+    reset_data = {"email": "reset@example.com"}
+
     response = client.post("/api/v1/auth/password-reset-request", json=reset_data)
     assert response.status_code == 202
     data = response.json()
@@ -123,11 +121,8 @@ def test_password_reset_request(client: TestClient, auth_headers):
 @pytest.mark.integration
 def test_root_user_login(client: TestClient):
     """Test that root user can login."""
-    login_data = {
-        "username": "root",
-        "password": "Root1234!"
-    }
-    
+    login_data = {"username": "root", "password": "Root1234!"}
+
     response = client.post("/api/v1/auth/login", data=login_data)
     assert response.status_code == 200
     data = response.json()
@@ -144,10 +139,200 @@ def test_unauthorized_register_attempt(client: TestClient):
         "username": "unauthorized",
         "password": "password123",
         "full_name": "Unauthorized User",
-        "company_id": 1
+        "company_id": 1,
     }
-    
+
     response = client.post("/api/v1/auth/register", json=user_data)
     assert response.status_code == 401
     data = response.json()
-    assert data["detail"] == "Not authenticated" 
\ No newline at end of file
+    assert data["detail"] == "Not authenticated"
+
+
+@pytest.mark.integration
+def test_refresh_token_rotation(client: TestClient):
+    """Test that refreshing rotates the refresh token."""
+    tokens = login(client)
+
+    response = client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["refresh_token"] != tokens["refresh_token"]
+    assert "access_token" in data
+
+
+@pytest.mark.integration
+def test_refresh_token_reuse_revokes_family(client: TestClient):
+    """Test that replaying a rotated refresh token revokes its whole family."""
+    tokens = login(client)
+
+    response = client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200
+    successor = response.json()["refresh_token"]
+
+    # Replay outside the grace window
+    response = client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+    # The legitimate successor is revoked as well
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": successor})
+    assert response.status_code == 401
+
+
+@pytest.mark.integration
+def test_refresh_token_is_cached_only_after_commit(client: TestClient):
+    """Test that a rotation that fails to commit hands out no cached tokens."""
+    tokens = login(client)
+    with (
+        patch("app.api.v1.endpoints.auth.cache_rotated_refresh_token") as cache,
+        patch("app.crud.session.get_session_expiry", side_effect=RuntimeError),
+    ):
+        response = client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+    assert response.status_code == 401
+    cache.assert_not_called()
+
+    response = client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.integration
+def test_refresh_token_concurrent_grace_window(client: TestClient):
+    """Test that a just-rotated refresh token returns the same successor."""
+    store = {}
+    fake_redis = MagicMock()
+    fake_redis.get.side_effect = store.get
+    fake_redis.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+
+    with patch("app.core.redis.redis_client", fake_redis):
+        tokens = login(client)
+        first = client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        second = client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+@pytest.mark.integration
+def test_refresh_token_of_ended_session_is_not_waited_for(client: TestClient):
+    """Test that only tokens of a live session family wait for a successor."""
+    tokens = login(client)
+    client.post(
+        "/api/v1/auth/logout",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    with patch("app.api.v1.endpoints.auth._wait_for_rotated_tokens") as wait:
+        response = client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+    assert response.status_code == 401
+    wait.assert_not_called()
+
+
+@pytest.mark.integration
+def test_rejected_token_does_not_open_a_session(client: TestClient):
+    """Test that requests rejected during token validation use no connection."""
+    from sqlalchemy import event
+
+    from tests.conftest import test_engine
+
+    checkouts = []
+    listener = lambda *args: checkouts.append(args)
+    event.listen(test_engine, "checkout", listener)
+    try:
+        response = client.get(
+            "/api/v1/users/me", headers={"Authorization": "Bearer not-a-token"}
+        )
+        assert response.status_code == 401
+        assert checkouts == []
+    finally:
+        event.remove(test_engine, "checkout", listener)
+
+
+@pytest.mark.integration
+def test_auth_middleware_resolves_the_user_once(client: TestClient):
+    """Test that with the middleware the dependencies reuse its AuthContext."""
+    from app.api import deps
+    from app.api.middlewares.auth_context import AuthContextMiddleware
+    from app.main import app
+    from tests.conftest import TestSessionLocal
+
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    middleware = AuthContextMiddleware(app, session_factory=TestSessionLocal)
+    with (
+        TestClient(middleware) as middleware_client,
+        patch.object(
+            deps, "get_token_user_id", wraps=deps.get_token_user_id
+        ) as validate,
+    ):
+        response = middleware_client.get("/api/v1/users/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["username"] == "root"
+        validate.assert_called_once()
+
+        response = middleware_client.get(
+            "/api/v1/users/me", headers={"Authorization": "Bearer not-a-token"}
+        )
+        assert response.status_code == 401
+
+
+@pytest.mark.benchmark
+def test_auth_middleware_throughput(client: TestClient):
+    """Report requests/sec on /users/me with and without the middleware."""
+    import time
+
+    from app.api.middlewares.auth_context import AuthContextMiddleware
+    from app.main import app
+    from tests.conftest import TestSessionLocal
+
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    requests = 300
+    middleware = AuthContextMiddleware(app, session_factory=TestSessionLocal)
+    with TestClient(middleware) as middleware_client:
+        for name, test_client in (
+            ("dependencies", client),
+            ("middleware", middleware_client),
+        ):
+            test_client.get("/api/v1/users/me", headers=headers)
+            start = time.perf_counter()
+            for _ in range(requests):
+                test_client.get("/api/v1/users/me", headers=headers)
+            elapsed = time.perf_counter() - start
+            print(f"\n{name}: {requests / elapsed:.0f} requests/sec")
+
+
+@pytest.mark.integration
+def test_auth_dependencies_need_no_session_or_scheme(client: TestClient):
+    """Test that resolving the user takes no DB or OAuth2 sub-dependencies."""
+    from fastapi.dependencies.utils import get_dependant
+
+    from app.api import deps
+
+    for dependency in (deps.get_current_active_user, deps.get_current_active_superuser):
+        (resolve_user,) = get_dependant(path="/", call=dependency).dependencies
+        assert resolve_user.call is deps.get_current_user
+        # Only the session factory, which opens nothing by itself
+        (session_factory,) = resolve_user.dependencies
+        assert session_factory.call is deps.get_session_factory
+
+    response = client.get("/api/v1/companies/")
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Not authenticated"
+    # Still documented as the OAuth2 scheme
+    schemes = client.get("/api/v1/openapi.json").json()["components"]
+    assert "OAuth2PasswordBearer" in schemes["securitySchemes"]
@@ -0,0 +1,134 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="function")
+def authz_setup(client: TestClient):
+    """A tenant with a 'viewer' holding 'users:read', and an integration key."""
+    from app.crud.integration import get_api_key_prefix, hash_api_key
+    from app.models import integration  # noqa: F401  (mapper registry)
+    from app.models.company import Company
+    from app.models.integration import Integration
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+    from app.models.user import User
+    from tests.conftest import TestSessionLocal, test_engine
+
+    Integration.__table__.create(bind=test_engine, checkfirst=True)
+    session = TestSessionLocal()
+    company = Company(name="Tenant", is_active=True, is_root=False)
+    session.add(company)
+    session.flush()
+
+    resource_type = ResourceType(name="users", company_id=company.id)
+    session.add(resource_type)
+    session.flush()
+    permission = Permission(
+        name="users:read", action="read", resource_type_id=resource_type.id
+    )
+    viewer = User(
+        email="viewer@example.com",
+        username="viewer",
+        hashed_password="x",
+        is_active=True,
+        company_id=company.id,
+    )
+    inactive = User(
+        email="inactive@example.com",
+        username="inactive",
+        hashed_password="x",
+        is_active=False,
+        company_id=company.id,
+    )
+    role = Role(name="viewer", company_id=company.id)
+    role.permissions.append(permission)
+    role.users.extend([viewer, inactive])
+    api_integration = Integration(
+        name="billing",
+        integration_type="billing",
+        api_key_prefix=get_api_key_prefix("test-api-key"),
+        api_key_hash=hash_api_key("test-api-key"),
+        api_secret="test-api-secret",
+        company_id=company.id,
+        is_active=True,
+    )
+    session.add_all([permission, viewer, inactive, role, api_integration])
+    session.commit()
+    ids = {"viewer": viewer.id, "inactive": inactive.id}
+    session.close()
+    return ids
+
+
+@pytest.mark.integration
+def test_authz_batch_check(client: TestClient, authz_setup):
+    """Test that batched checks return one decision per check, in order."""
+    viewer = authz_setup["viewer"]
+    checks = [
+        {"subject": viewer, "permission": "users:read"},
+        {"subject": viewer, "permission": "read", "resource": "users"},
+        {"subject": viewer, "permission": "users:write"},
+        {"subject": authz_setup["inactive"], "permission": "users:read"},
+        # The root user belongs to another company
+        {"subject": 1, "permission": "users:read"},
+        {"subject": 999, "permission": "users:read"},
+    ]
+    response = client.post(
+        "/api/v1/authz/check",
+        json={"checks": checks},
+        headers={"X-API-Key": "test-api-key"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"results": [True, True, False, False, False, False]}
+
+    response = client.post("/api/v1/authz/check", json={"checks": checks})
+    assert response.status_code == 401
+
+
+@pytest.mark.slow
+def test_authz_batch_check_large_batches(client: TestClient, authz_setup):
+    """Test that 1, 100 and 10k checks are answered in request order."""
+    viewer = authz_setup["viewer"]
+    for size in (1, 100, 10000):
+        checks = [
+            {"subject": viewer, "permission": "users:read" if i % 2 else "x:y"}
+            for i in range(size)
+        ]
+        response = client.post(
+            "/api/v1/authz/check",
+            json={"checks": checks},
+            headers={"X-API-Key": "test-api-key"},
+        )
+        assert response.status_code == 200
+        assert response.json()["results"] == [bool(i % 2) for i in range(size)]
+
+
+@pytest.mark.benchmark
+def test_authz_batch_check_benchmark(client: TestClient, authz_setup):
+    """Report request latency of batches of 1, 100 and 10k checks."""
+    import time
+
+    viewer = authz_setup["viewer"]
+    iterations = 5
+    for size in (1, 100, 10000):
+        checks = [
+            {"subject": viewer, "permission": "users:read" if i % 2 else "x:y"}
+            for i in range(size)
+        ]
+
+        def check():
+            return client.post(
+                "/api/v1/authz/check",
+                json={"checks": checks},
+                headers={"X-API-Key": "test-api-key"},
+            )
+
+        check()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            check()
+        elapsed = (time.perf_counter() - start) / iterations
+        print(
+            f"\n{size} checks: {elapsed * 1e3:.2f}ms/request, "
+            f"{elapsed / size * 1e6:.2f}us/check"
+        )
@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+from app.core.cache import SnapshotCache
+from app.models import integration  # noqa: F401  (mapper registry)
+
+
+@pytest.mark.unit
+def test_snapshot_cache_serves_fresh_values():
+    """Test that values are reused within the TTL."""
+    cache = SnapshotCache(ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute("key", compute) == 1
+    assert cache.get_or_compute("key", compute) == 1
+    assert cache.get_or_compute("other", compute) == 2
+
+
+@pytest.mark.unit
+def test_snapshot_cache_collapses_concurrent_computations():
+    """Test that concurrent callers of a missing key share one computation."""
+    cache = SnapshotCache(ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("k", compute))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_snapshot_cache_serves_stale_while_refreshing():
+    """Test that a stale value is returned while another caller refreshes."""
+    cache = SnapshotCache(ttl=0, stale_ttl=60)
+    cache.get_or_compute("k", lambda: "old")
+
+    lock = cache._lock_for("k")
+    lock.acquire()
+    try:
+        assert cache.get_or_compute("k", lambda: "new") == "old"
+    finally:
+        lock.release()
+
+    assert cache.get_or_compute("k", lambda: "new") == "new"
+
+
+@pytest.mark.unit
+def test_root_company_identity_is_cached(db):
+    """Test that the root company is queried once and then served from cache."""
+    from sqlalchemy import event
+
+    from app.crud import company as crud_company
+
+    crud_company.invalidate_root_company_cache()
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        first = crud_company.get_root_company_identity(db)
+        second = crud_company.get_root_company_identity(db)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert first == second
+    assert first.name == "Root Company"
+    assert len(statements) == 1
+
+
+@pytest.fixture(scope="function")
+def redis_store():
+    """Dict-backed Redis replacement, with in-process caches reset."""
+    from unittest.mock import MagicMock, patch
+
+    from app.core.cache import clear_local_caches
+
+    clear_local_caches()
+    store = {}
+    fake = MagicMock()
+    fake.get.side_effect = store.get
+    fake.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+    fake.delete.side_effect = lambda *keys: [store.pop(key, None) for key in keys]
+    fake.incr.side_effect = lambda key: store.__setitem__(
+        key, int(store.get(key) or 0) + 1
+    )
+    with patch("app.core.redis.redis_client", fake):
+        yield store
+    clear_local_caches()
+
+
+@pytest.mark.unit
+def test_tenant_reads_are_cached_per_generation(db, redis_store):
+    """Test that a write only invalidates the cached reads of its tenant."""
+    from types import SimpleNamespace
+
+    import orjson
+    from sqlalchemy import event
+
+    from app import crud
+    from app.core.cache import clear_local_caches
+    from app.core.tenant_cache import invalidate_shared
+    from app.models.company import Company
+    from app.models.roles import Role
+    from app.schemas.role import RoleUpdate
+
+    other = Company(name="Tenant B")
+    db.add(other)
+    db.flush()
+    role_a = Role(name="a", company_id=1)
+    role_b = Role(name="b", company_id=other.id)
+    db.add_all([role_a, role_b])
+    db.commit()
+    member_a = SimpleNamespace(company_id=1, is_superuser=False)
+    member_b = SimpleNamespace(company_id=other.id, is_superuser=False)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+
+    def count(read):
+        statements.clear()
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        try:
+            return read(), len(statements)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    def roles_of(member):
+        return lambda: crud.role.get_roles(db, current_user=member)
+
+    assert count(roles_of(member_a))[1] > 0
+    assert count(roles_of(member_b))[1] > 0
+    roles, queries = count(roles_of(member_a))
+    assert [role["name"] for role in roles] == ["a"] and queries == 0
+
+    crud.role.update_role(db, db_obj=role_b, obj_in=RoleUpdate(name="b2"))
+    assert count(roles_of(member_a))[1] == 0
+    roles, queries = count(roles_of(member_b))
+    assert [role["name"] for role in roles] == ["b2"] and queries > 0
+
+    # Another process: nothing local, rebuilt from the JSON stored in Redis
+    clear_local_caches()
+    roles, queries = count(roles_of(member_b))
+    assert [role["name"] for role in roles] == ["b2"] and queries == 0
+    assert [role["id"] for role in roles] == [role_b.id]
+    payloads = [v for k, v in redis_store.items() if k.startswith("tenant:cache:")]
+    assert payloads and all(isinstance(orjson.loads(p), list) for p in payloads)
+
+    invalidate_shared()
+    assert count(roles_of(member_a))[1] > 0
@@ -0,0 +1,125 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import integration  # noqa: F401  (mapper registry)
+
+
+@pytest.fixture(scope="function")
+def redis_store():
+    """Dict-backed Redis replacement, with in-process caches reset."""
+    from unittest.mock import MagicMock, patch
+
+    from app.core.cache import clear_local_caches
+
+    clear_local_caches()
+    store = {}
+    fake = MagicMock()
+    fake.get.side_effect = store.get
+    fake.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+    fake.incr.side_effect = lambda key: store.__setitem__(
+        key, int(store.get(key) or 0) + 1
+    )
+    with patch("app.core.redis.redis_client", fake):
+        yield store
+    clear_local_caches()
+
+
+def webhook(client, api_key):
+    return client.post(
+        "/api/v1/webhooks/crm", headers={"X-API-Key": api_key}, json={"event": "x"}
+    )
+
+
+@pytest.mark.integration
+def test_webhook_api_keys_are_hashed_and_cached(client: TestClient, auth_headers):
+    """Test that keys are shown once, stored hashed, and looked up from cache."""
+    from sqlalchemy import event
+
+    from app.models.integration import Integration
+    from tests.conftest import TestSessionLocal, test_engine
+
+    response = client.post(
+        "/api/v1/integrations/",
+        headers=auth_headers,
+        json={"name": "crm", "integration_type": "crm"},
+    )
+    assert response.status_code == 200
+    created = response.json()
+    api_key = created["api_key"]
+    prefix = created["api_key_prefix"]
+    assert api_key.startswith(f"{prefix}.")
+
+    listed = client.get("/api/v1/integrations/", headers=auth_headers).json()
+    assert "api_key" not in listed[0] and listed[0]["api_key_prefix"] == prefix
+    with TestSessionLocal() as session:
+        stored = session.query(Integration).one()
+        assert api_key not in (stored.api_key_hash, stored.api_secret)
+
+    assert webhook(client, api_key).status_code == 200
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(test_engine, "before_cursor_execute", listener)
+    try:
+        assert webhook(client, api_key).status_code == 200
+        assert webhook(client, f"{prefix}.wrong-secret").status_code == 401
+    finally:
+        event.remove(test_engine, "before_cursor_execute", listener)
+    assert statements == []
+
+    response = client.put(
+        f"/api/v1/integrations/{created['id']}",
+        headers=auth_headers,
+        json={"is_active": False},
+    )
+    assert response.status_code == 200
+    assert webhook(client, api_key).status_code == 401
+
+
+@pytest.mark.integration
+def test_regenerated_api_key_replaces_the_old_one(client: TestClient, auth_headers):
+    """Test that regenerating an API key revokes the previous one."""
+    response = client.post(
+        "/api/v1/integrations/",
+        headers=auth_headers,
+        json={"name": "crm", "integration_type": "crm"},
+    )
+    created = response.json()
+    assert webhook(client, created["api_key"]).status_code == 200
+
+    response = client.post(
+        f"/api/v1/integrations/{created['id']}/regenerate-key", headers=auth_headers
+    )
+    assert response.status_code == 200
+    regenerated = response.json()
+    assert regenerated["api_key"] != created["api_key"]
+    assert regenerated["api_key"].startswith(f"{regenerated['api_key_prefix']}.")
+    assert webhook(client, created["api_key"]).status_code == 401
+    assert webhook(client, regenerated["api_key"]).status_code == 200
+
+
+@pytest.mark.unit
+def test_api_key_cache_follows_writes_of_other_processes(db, redis_store):
+    """Test that a write published through Redis drops cached integrations."""
+    from unittest.mock import patch
+
+    from app import crud
+    from app.core.redis import bump_integration_cache_version
+    from app.models.integration import Integration
+    from app.schemas.integration import IntegrationCreate
+
+    _, api_key = crud.integration.create_integration(
+        db,
+        integration_in=IntegrationCreate(name="crm", integration_type="crm"),
+        company_id=1,
+    )
+    assert crud.integration.get_integration_by_api_key(db, api_key).is_active
+
+    # Another process deactivates the integration and publishes the write
+    db.query(Integration).update({"is_active": False})
+    db.commit()
+    assert crud.integration.get_integration_by_api_key(db, api_key).is_active
+    bump_integration_cache_version()
+
+    with patch("app.core.config.settings.INTEGRATION_CACHE_CHECK_SECONDS", 0):
+        cached = crud.integration.get_integration_by_api_key(db, api_key)
+    assert not cached.is_active
@@ -0,0 +1,653 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy import event
+from starlette.requests import Request
+
+from app.models import integration  # noqa: F401  (mapper registry)
+
+
+@pytest.fixture(scope="function")
+def fake_redis():
+    """Dict-backed Redis replacement, with in-process caches reset."""
+    from app.core.cache import clear_local_caches
+
+    clear_local_caches()
+    store = {}
+    fake = MagicMock()
+    fake.get.side_effect = store.get
+    fake.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+    fake.delete.side_effect = lambda *keys: [store.pop(key, None) for key in keys]
+    fake.incr.side_effect = lambda key: store.__setitem__(
+        key, int(store.get(key) or 0) + 1
+    )
+    with patch("app.core.redis.redis_client", fake):
+        yield store
+    clear_local_caches()
+
+
+@pytest.fixture(scope="function")
+def rbac(db):
+    """Root user holding a 'viewer' role, and a 'users:read' permission."""
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+    from app.models.user import User
+
+    user = db.query(User).filter(User.username == "root").one()
+    resource_type = ResourceType(name="users", company_id=user.company_id)
+    db.add(resource_type)
+    db.flush()
+    permission = Permission(
+        name="users:read", action="read", resource_type_id=resource_type.id
+    )
+    role = Role(name="viewer", company_id=user.company_id)
+    role.users.append(user)
+    db.add_all([permission, role])
+    db.commit()
+    return user, role, permission
+
+
+def resolve_user(token):
+    """Run get_current_user for a request carrying the bearer token."""
+    from app.api import deps
+    from tests.conftest import TestSessionLocal
+
+    request = Request(
+        {"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    )
+    return deps.get_current_user(request, TestSessionLocal)
+
+
+def count_queries(db):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    return statements, lambda: event.remove(
+        db.get_bind(), "before_cursor_execute", listener
+    )
+
+
+@pytest.mark.unit
+def test_effective_permissions_are_cached(db, fake_redis, rbac):
+    """Test that effective permissions are loaded once, then served from cache."""
+    from app import crud
+
+    user, role, permission = rbac
+    crud.role.assign_permission_to_role(db, role=role, permission=permission)
+    db.refresh(user)
+
+    statements, stop = count_queries(db)
+    try:
+        first = crud.permission.get_user_permission_names(db, user)
+        second = crud.permission.get_user_permission_names(db, user)
+    finally:
+        stop()
+
+    assert first == second == frozenset({"users:read"})
+    assert len(statements) == 1
+    assert f"perms:{user.id}" in fake_redis
+
+
+@pytest.mark.unit
+def test_role_permission_changes_invalidate_cache(db, fake_redis, rbac):
+    """Test that assigning and removing role permissions invalidates users."""
+    from app import crud
+
+    user, role, permission = rbac
+    assert crud.permission.get_user_permission_names(db, user) == frozenset()
+
+    crud.role.assign_permission_to_role(db, role=role, permission=permission)
+    assert crud.permission.get_user_permission_names(db, user) == {"users:read"}
+
+    crud.role.remove_permission_from_role(db, role=role, permission=permission)
+    assert crud.permission.get_user_permission_names(db, user) == frozenset()
+
+
+@pytest.mark.unit
+def test_permission_delete_invalidates_cache(db, fake_redis, rbac):
+    """Test that deleting a permission invalidates users holding it."""
+    from app import crud
+
+    user, role, permission = rbac
+    crud.role.assign_permission_to_role(db, role=role, permission=permission)
+    assert crud.permission.get_user_permission_names(db, user) == {"users:read"}
+
+    crud.permission.delete_permission(db, permission_id=permission.id)
+    assert crud.permission.get_user_permission_names(db, user) == frozenset()
+
+
+@pytest.mark.unit
+def test_bulk_role_users_are_set_based(db, fake_redis, rbac):
+    """Test that adding, replacing and removing role users runs set-based."""
+    from app import crud
+    from app.models.company import Company
+    from app.models.user import User
+
+    user, role, permission = rbac
+    crud.role.assign_permission_to_role(db, role=role, permission=permission)
+    other_company = Company(name="other")
+    db.add(other_company)
+    db.flush()
+    members = [
+        User(
+            username=f"member{i}",
+            email=f"member{i}@example.com",
+            hashed_password="x",
+            company_id=user.company_id,
+        )
+        for i in range(3)
+    ]
+    outsider = User(
+        username="outsider",
+        email="outsider@example.com",
+        hashed_password="x",
+        company_id=other_company.id,
+    )
+    db.add_all(members + [outsider])
+    db.commit()
+    member_ids = [member.id for member in members]
+    for member_id in member_ids:
+        crud.permission.get_user_grants(db, db.get(User, member_id))
+    assert f"perms:{member_ids[0]}" in fake_redis
+
+    statements, stop = count_queries(db)
+    try:
+        result = crud.role.update_role_users(
+            db, role=role, user_ids=member_ids + [outsider.id, user.id], mode="add"
+        )
+    finally:
+        stop()
+    assert result == {"added": 3, "removed": 0}
+    assert len([s for s in statements if s.lstrip().startswith("INSERT")]) == 1
+    assert f"perms:{member_ids[0]}" not in fake_redis
+    assert sorted(crud.role.get_role_user_ids(db, [role.id])) == sorted(
+        member_ids + [user.id]
+    )
+
+    result = crud.role.update_role_users(
+        db, role=role, user_ids=member_ids[:2], mode="replace"
+    )
+    assert result == {"added": 0, "removed": 2}
+    assert crud.permission.get_user_permission_names(db, user) == frozenset()
+
+    result = crud.role.update_role_users(
+        db, role=role, user_ids=member_ids, mode="remove"
+    )
+    assert result == {"added": 0, "removed": 2}
+    assert crud.role.get_role_user_ids(db, [role.id]) == []
+
+
+@pytest.mark.integration
+def test_bulk_role_permission_endpoints(client, auth_headers):
+    """Test the bulk role permission endpoints."""
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+    from tests.conftest import TestSessionLocal
+
+    with TestSessionLocal() as session:
+        resource_type = ResourceType(name="reports", company_id=1)
+        session.add(resource_type)
+        session.flush()
+        permissions = [
+            Permission(
+                name=f"reports:{action}",
+                action=action,
+                resource_type_id=resource_type.id,
+            )
+            for action in ("read", "write", "delete")
+        ]
+        role = Role(name="reporter", company_id=1)
+        session.add_all(permissions + [role])
+        session.commit()
+        role_id = role.id
+        permission_ids = [permission.id for permission in permissions]
+
+    url = f"/api/v1/roles/{role_id}/permissions"
+    response = client.post(
+        url, headers=auth_headers, json={"permission_ids": permission_ids[:2]}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"added": 2, "removed": 0}
+
+    response = client.put(
+        url, headers=auth_headers, json={"permission_ids": permission_ids[1:]}
+    )
+    assert response.json() == {"added": 1, "removed": 1}
+
+    response = client.request(
+        "DELETE", url, headers=auth_headers, json={"permission_ids": permission_ids}
+    )
+    assert response.json() == {"added": 0, "removed": 2}
+
+    response = client.get(f"/api/v1/roles/{role_id}", headers=auth_headers)
+    assert response.json()["permissions"] == []
+
+
+@pytest.fixture(scope="function")
+def role_managers(client):
+    """
+    A role of the root company, and headers of a regular user of that
+    company and of a superuser of another company.
+    """
+    from app.core.security import get_password_hash
+    from app.models.company import Company
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+    from app.models.user import User
+    from tests.conftest import TestSessionLocal, login
+
+    with TestSessionLocal() as session:
+        other = Company(name="Other", is_active=True, is_root=False)
+        session.add(other)
+        session.flush()
+        resource_type = ResourceType(name="reports", company_id=1)
+        session.add(resource_type)
+        session.flush()
+        permission = Permission(
+            name="reports:read", action="read", resource_type_id=resource_type.id
+        )
+        admin = Role(name="admin", company_id=1)
+        member = User(
+            username="member",
+            email="member@example.com",
+            hashed_password=get_password_hash("Member1234!"),
+            is_active=True,
+            company_id=1,
+        )
+        outsider = User(
+            username="outsider",
+            email="outsider@example.com",
+            hashed_password=get_password_hash("Outsider1234!"),
+            is_active=True,
+            is_superuser=True,
+            company_id=other.id,
+        )
+        member_role = Role(name="member", company_id=1)
+        member_role.users.append(member)
+        session.add_all([permission, admin, member, outsider, member_role])
+        session.commit()
+        ids = {
+            "admin": admin.id,
+            "member_role": member_role.id,
+            "member": member.id,
+            "permission": permission.id,
+        }
+
+    def headers(username, password):
+        token = login(client, username, password)["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    return (
+        ids,
+        headers("member", "Member1234!"),
+        headers("outsider", "Outsider1234!"),
+    )
+
+
+@pytest.mark.integration
+def test_bulk_role_endpoints_require_a_managing_superuser(client, role_managers):
+    """Test that only superusers of the role's company change its links."""
+    ids, member_headers, outsider_headers = role_managers
+    requests = [
+        ("users", {"user_ids": [ids["member"]]}),
+        ("permissions", {"permission_ids": [ids["permission"]]}),
+    ]
+    for headers in (member_headers, outsider_headers):
+        for links, body in requests:
+            for method in ("POST", "PUT", "DELETE"):
+                response = client.request(
+                    method,
+                    f"/api/v1/roles/{ids['admin']}/{links}",
+                    headers=headers,
+                    json=body,
+                )
+                assert response.status_code == 403, (method, links)
+
+    response = client.get(f"/api/v1/roles/{ids['admin']}", headers=member_headers)
+    assert response.json()["permissions"] == []
+
+
+@pytest.mark.integration
+def test_role_parent_endpoints_require_a_managing_superuser(
+    client, auth_headers, role_managers
+):
+    """Test that only superusers of the role's company change its parents."""
+    ids, member_headers, outsider_headers = role_managers
+    url = f"/api/v1/roles/{ids['member_role']}/parents/{ids['admin']}"
+    for headers in (member_headers, outsider_headers):
+        assert client.post(url, headers=headers).status_code == 403
+        assert client.delete(url, headers=headers).status_code == 403
+
+    response = client.post(url, headers=auth_headers)
+    assert response.status_code == 200
+    reverse = f"/api/v1/roles/{ids['admin']}/parents/{ids['member_role']}"
+    assert client.post(reverse, headers=auth_headers).status_code == 400
+
+
+@pytest.mark.unit
+def test_role_inheritance_closure(db, fake_redis, rbac):
+    """Test that inherited permissions follow parent edits and reject cycles."""
+    from fastapi import HTTPException
+
+    from app import crud
+    from app.core.rbac import get_catalog
+    from app.models.roles import Role, RoleClosure
+
+    user, viewer, permission = rbac
+    crud.role.assign_permission_to_role(db, role=viewer, permission=permission)
+    editor = Role(name="editor", company_id=user.company_id)
+    admin = Role(name="admin", company_id=user.company_id)
+    auditor = Role(name="auditor", company_id=user.company_id)
+    db.add_all([editor, admin, auditor])
+    db.commit()
+    viewer.users.remove(user)
+    admin.users.append(user)
+    db.commit()
+
+    def closure():
+        return {(row.role_id, row.inherited_role_id) for row in db.query(RoleClosure)}
+
+    def grants():
+        catalog = get_catalog(db)
+        allowed = catalog.allows(
+            catalog.grants([admin.id]), catalog.mask_for(["users:read"])
+        )
+        return crud.permission.get_user_permission_names(db, user), allowed
+
+    assert grants() == (frozenset(), False)
+
+    crud.role.add_role_parent(db, role=editor, parent=viewer)
+    crud.role.add_role_parent(db, role=admin, parent=editor)
+    crud.role.add_role_parent(db, role=admin, parent=auditor)
+    crud.role.add_role_parent(db, role=auditor, parent=viewer)
+    assert (admin.id, viewer.id) in closure()
+    assert sorted(admin.parent_ids) == sorted([editor.id, auditor.id])
+    assert grants() == ({"users:read"}, True)
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.role.add_role_parent(db, role=viewer, parent=admin)
+    assert exc_info.value.status_code == 400
+    with pytest.raises(HTTPException):
+        crud.role.add_role_parent(db, role=viewer, parent=viewer)
+
+    # Admin still reaches viewer through auditor
+    crud.role.remove_role_parent(db, role=admin, parent=editor)
+    assert (admin.id, editor.id) not in closure()
+    assert grants() == ({"users:read"}, True)
+
+    crud.role.delete_role(db, role_id=auditor.id)
+    assert all(auditor.id not in pair for pair in closure())
+    assert (admin.id, viewer.id) not in closure()
+    assert (editor.id, viewer.id) in closure()
+    assert grants() == (frozenset(), False)
+
+
+@pytest.mark.unit
+def test_auth_context_is_loaded_in_one_query_per_request(db, fake_redis, rbac):
+    """Test that authenticating a request costs one query, then none."""
+    from app import crud
+    from app.core.rbac import get_catalog
+    from app.core.security import create_access_token
+
+    user, role, permission = rbac
+    crud.role.assign_permission_to_role(db, role=role, permission=permission)
+    user.is_superuser = False
+    db.commit()
+    token = create_access_token(user.id)
+    catalog = get_catalog(db)
+
+    # One query when nothing is cached, none once the user is cached
+    for expected_queries in (1, 0):
+        statements, stop = count_queries(db)
+        try:
+            current_user = resolve_user(token)
+        finally:
+            stop()
+        assert len(statements) == expected_queries
+        assert current_user.role_ids == {role.id}
+        assert current_user.permissions == {"users:read"}
+        granted = catalog.grants(current_user.role_ids)
+        assert catalog.allows(granted, catalog.mask_for(["users:read"]))
+
+
+@pytest.mark.unit
+def test_auth_context_cache_is_invalidated_on_user_writes(db, fake_redis, rbac):
+    """Test that a deactivated user is cut off as soon as the write commits."""
+    from fastapi import HTTPException
+
+    from app import crud
+    from app.core.security import create_access_token
+
+    user, role, permission = rbac
+    token = create_access_token(user.id)
+    crud.user.principal_cache_lookups.reset()
+
+    assert resolve_user(token).is_active
+    assert resolve_user(token).is_active
+    assert f"principal:{user.id}" in fake_redis
+
+    crud.user.update_user(db, db_obj=user, obj_in={"is_active": False})
+    assert f"principal:{user.id}" not in fake_redis
+    with pytest.raises(HTTPException) as exc_info:
+        resolve_user(token)
+    assert exc_info.value.detail == "Inactive user"
+
+    stats = crud.user.get_principal_cache_stats()
+    assert stats["lookups"] == {"miss": 2, "local_hit": 1}
+    assert stats["hit_ratio"] == pytest.approx(1 / 3)
+
+
+@pytest.mark.benchmark
+def test_auth_context_benchmark(db, fake_redis, rbac):
+    """Report AuthContext against the separate snapshot and grants lookups."""
+    import time
+    import tracemalloc
+
+    from app import crud
+
+    user, role, permission = rbac
+    user_id = user.id
+    iterations = 1000
+
+    def snapshot_and_grants():
+        # The previous path: the cached snapshot, then the cached grants
+        snapshot = crud.user.get_user_snapshot(db, user_id)
+        return snapshot, crud.permission.get_user_grants(db, snapshot)
+
+    def auth_context():
+        return crud.user.get_auth_context(db, user_id)
+
+    for name, load in (
+        ("snapshot + grants", snapshot_and_grants),
+        ("auth context", auth_context),
+    ):
+        # Both paths are timed with their caches warm
+        load()
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            load()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"\n{name}: {elapsed / iterations * 1e6:.1f}us/request, peak {peak}B")
+
+
+@pytest.mark.unit
+def test_catalog_masks_follow_role_grants(db, fake_redis, rbac):
+    """Test that the catalog compiles role grants and reloads on changes."""
+    from app import crud
+    from app.core.rbac import get_catalog
+
+    user, role, permission = rbac
+    catalog = get_catalog(db)
+    required = catalog.mask_for(["users:read"])
+    assert not catalog.allows(catalog.grants([role.id]), required)
+    assert catalog.mask_for(["users:write"]) is None
+
+    crud.role.assign_permission_to_role(db, role=role, permission=permission)
+    catalog = get_catalog(db)
+    assert catalog.version == 1
+    assert catalog.allows(catalog.grants([role.id]), required)
+    assert not catalog.allows(catalog.grants([]), required)
+    assert not catalog.allows(catalog.grants([role.id]), None)
+
+
+@pytest.mark.unit
+def test_catalog_mask_checks_match_list_membership():
+    """Test that AND-mask checks agree with checking names against a list."""
+    from app.core.rbac import RBACCatalog
+
+    names = [f"resource{i}:action{j}" for i in range(50) for j in range(10)]
+    bits = {name: bit for bit, name in enumerate(names)}
+    granted_names = names[::2]
+    catalog = RBACCatalog(
+        version=1,
+        bits=bits,
+        role_masks={1: sum(1 << bits[name] for name in granted_names)},
+    )
+    grants = catalog.grants([1])
+    for offset in range(10):
+        required_names = names[offset : offset + 5 : 2]
+        assert catalog.allows(grants, catalog.mask_for(required_names)) == all(
+            name in granted_names for name in required_names
+        )
+
+
+@pytest.mark.benchmark
+def test_catalog_mask_check_benchmark():
+    """Report AND-mask checks against list membership checks."""
+    import time
+
+    from app.core.rbac import RBACCatalog
+
+    names = [f"resource{i}:action{j}" for i in range(50) for j in range(10)]
+    bits = {name: bit for bit, name in enumerate(names)}
+    granted_names = names[::2]
+    required_names = granted_names[:5]
+    catalog = RBACCatalog(
+        version=1,
+        bits=bits,
+        role_masks={1: sum(1 << bits[name] for name in granted_names)},
+    )
+    required = catalog.mask_for(required_names)
+    iterations = 10000
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        all(name in granted_names for name in required_names)
+    list_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        catalog.allows(catalog.grants([1]), required)
+    mask_elapsed = time.perf_counter() - start
+
+    print(f"\nlist membership: {list_elapsed:.4f}s, and-mask: {mask_elapsed:.4f}s")
+
+
+def add_permissions(db, names):
+    """Create the named permissions and one role holding each of them."""
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+
+    resource_type = ResourceType(name="wildcards", company_id=1)
+    db.add(resource_type)
+    db.flush()
+    permissions = {
+        name: Permission(
+            name=name,
+            action=name.partition(":")[2] or name,
+            resource_type_id=resource_type.id,
+        )
+        for name in names
+    }
+    roles = {name: Role(name=f"holds {name}", company_id=1) for name in names}
+    for name, role in roles.items():
+        role.permissions.append(permissions[name])
+    db.add_all(list(permissions.values()) + list(roles.values()))
+    db.commit()
+    return roles
+
+
+@pytest.mark.unit
+def test_wildcard_grants_precedence(db, fake_redis):
+    """Test which permissions each wildcard grant covers."""
+    from app.core.rbac import get_catalog
+
+    names = [
+        "users:read",
+        "users:write",
+        "roles:read",
+        "users:*",
+        "*:read",
+        "*",
+        "user*:read",
+    ]
+    roles = add_permissions(db, names)
+    catalog = get_catalog(db)
+
+    def allows(grant, name):
+        return catalog.allows(
+            catalog.grants([roles[grant].id]), catalog.mask_for([name])
+        )
+
+    assert allows("users:*", "users:read") and allows("users:*", "users:write")
+    assert not allows("users:*", "roles:read")
+    assert allows("*:read", "users:read") and allows("*:read", "roles:read")
+    assert not allows("*:read", "users:write")
+    assert all(allows("*", name) for name in names)
+    # A required wildcard needs an equal or broader grant
+    assert allows("users:*", "users:*") and allows("*", "users:*")
+    assert not allows("users:read", "users:*")
+    assert not allows("*:read", "users:*")
+    assert not allows("users:*", "*:read")
+    # Partial patterns are literal names, and unknown names stay denied
+    assert not allows("user*:read", "users:read")
+    assert not allows("*", "reports:read")
+
+
+@pytest.mark.benchmark
+def test_wildcard_check_benchmark(db, fake_redis):
+    """Report compiled checks against matching a 1,000-grant role."""
+    import time
+    from fnmatch import fnmatchcase
+
+    from app.core.rbac import get_catalog
+    from app.models.permissions import Permission
+    from app.models.roles import Role
+
+    names = [f"resource{i}:action{j}" for i in range(100) for j in range(9)]
+    names += [f"resource{i}:*" for i in range(50)] + [
+        f"*:action{j}" for j in range(9)
+    ]
+    names += [f"extra{i}:read" for i in range(1000 - len(names))]
+    add_permissions(db, names)
+    role = Role(name="holds everything", company_id=1)
+    role.permissions = db.query(Permission).all()
+    db.add(role)
+    db.commit()
+
+    catalog = get_catalog(db)
+    required_names = ["resource99:action8", "resource7:action3", "extra5:read"]
+    iterations = 200
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for name in required_names:
+            any(fnmatchcase(name, grant) for grant in names)
+    match_elapsed = time.perf_counter() - start
+
+    required = catalog.mask_for(required_names)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        catalog.allows(catalog.grants([role.id]), required)
+    compiled_elapsed = time.perf_counter() - start
+
+    print(
+        f"\npattern matching: {match_elapsed:.4f}s, "
+        f"compiled: {compiled_elapsed:.4f}s"
+    )
@@ -0,0 +1,263 @@
+from datetime import datetime
+
+import pytest
+
+from app.models import company, integration, sessions, user  # noqa: F401  (mappers)
+
+NOW = datetime(2024, 1, 1)
+
+
+def make_roles(count, permissions_per_role=5):
+    """Detached roles, each granting its own 'users:*' permissions."""
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+
+    resource_type = ResourceType(id=1, name="users")
+    roles = []
+    for i in range(count):
+        role = Role(
+            id=i, name=f"role{i}", created_at=NOW, is_default=False, company_id=1
+        )
+        role.permissions = [
+            Permission(
+                id=j,
+                name=f"users:action{j}",
+                action=f"action{j}",
+                resource_type_id=1,
+                resource_type=resource_type,
+                created_at=NOW,
+            )
+            for j in range(permissions_per_role)
+        ]
+        roles.append(role)
+    return roles
+
+
+def make_users(count):
+    from app.models.user import User
+
+    return [
+        User(
+            id=i,
+            email=f"user{i}@example.com",
+            username=f"user{i}",
+            is_active=True,
+            is_superuser=False,
+            is_verified=True,
+            created_at=NOW,
+            updated_at=NOW,
+            company_id=1,
+        )
+        for i in range(count)
+    ]
+
+
+def validated_roles(roles):
+    """Roles as FastAPI encoded them through the response model."""
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from app.schemas.role import RoleWithPermissions
+
+    validated = [
+        RoleWithPermissions.model_validate(
+            {
+                **role.__dict__,
+                "permissions": [
+                    {**p.__dict__, "resource": p.resource_type.name}
+                    for p in role.permissions
+                ],
+            }
+        )
+        for role in roles
+    ]
+    return TypeAdapter(List[RoleWithPermissions]).dump_json(validated)
+
+
+def validated_users(users):
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from app.schemas.user import User as UserSchema
+
+    adapter = TypeAdapter(List[UserSchema])
+    return adapter.dump_json(adapter.validate_python(users, from_attributes=True))
+
+
+def listed_roles(roles):
+    """Roles as crud.role.get_roles caches them and the endpoint sends them."""
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from app.api.serializers import json_response
+    from app.schemas.role import RoleListing
+
+    adapter = TypeAdapter(List[RoleListing])
+    value = adapter.validate_python(roles, from_attributes=True)
+    return json_response(adapter.dump_python(value, mode="json")).body
+
+
+def serialized_users(users):
+    from app.api.serializers import json_response, serialize_users
+
+    return json_response(serialize_users(users)).body
+
+
+@pytest.mark.integration
+def test_list_endpoints_serialize_roles_and_users(client, auth_headers):
+    """Test the JSON sent by the role and user list endpoints."""
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+    from tests.conftest import TestSessionLocal
+
+    session = TestSessionLocal()
+    resource_type = ResourceType(name="users", company_id=1)
+    session.add(resource_type)
+    session.flush()
+    role = Role(name="viewer", company_id=1)
+    role.permissions.append(
+        Permission(name="users:read", action="read", resource_type_id=resource_type.id)
+    )
+    session.add(role)
+    session.commit()
+    session.close()
+
+    response = client.get("/api/v1/roles/", headers=auth_headers)
+    assert response.status_code == 200
+    (role_data,) = response.json()
+    assert role_data["name"] == "viewer"
+    assert set(role_data) == {
+        "id",
+        "name",
+        "description",
+        "created_at",
+        "is_default",
+        "updated_at",
+        "company_id",
+        "permissions",
+    }
+    (permission_data,) = role_data["permissions"]
+    assert permission_data["name"] == "users:read"
+    assert permission_data["resource"] == "users"
+
+    response = client.get(
+        "/api/v1/roles/", params={"include_permissions": False}, headers=auth_headers
+    )
+    assert "permissions" not in response.json()[0]
+
+    response = client.get(
+        "/api/v1/roles/", params={"normalized": True}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    catalog = response.json()
+    (role_data,) = catalog["roles"]
+    (permission_id,) = role_data["permission_ids"]
+    permission_data = catalog["permissions"][str(permission_id)]
+    assert permission_data["name"] == "users:read"
+    resource_type_id = str(permission_data["resource_type_id"])
+    assert catalog["resource_types"][resource_type_id]["name"] == "users"
+
+    # Sent from the cached listing, shaped like the response schema
+    for _ in range(2):
+        response = client.get("/api/v1/permissions/", headers=auth_headers)
+        assert response.status_code == 200
+        (permission_data,) = response.json()
+        assert permission_data["resource"] == "users"
+        assert "resource_type" not in permission_data
+
+    response = client.get("/api/v1/users/", headers=auth_headers)
+    assert response.status_code == 200
+    (user_data,) = response.json()
+    assert user_data["username"] == "root"
+    assert "hashed_password" not in user_data
+
+
+@pytest.mark.unit
+def test_list_serializers_match_response_schemas():
+    """Test that the listings give the JSON the response schemas give."""
+    import orjson
+
+    roles = make_roles(50)
+    users = make_users(50)
+
+    assert orjson.loads(listed_roles(roles)) == orjson.loads(validated_roles(roles))
+    assert orjson.loads(serialized_users(users)) == orjson.loads(validated_users(users))
+
+
+@pytest.mark.unit
+def test_normalized_role_listing_is_smaller():
+    """Test that normalized listings shrink roles sharing their permissions."""
+    from pydantic import TypeAdapter
+
+    from app.api.serializers import json_response
+    from app.crud.role import role_catalog
+    from app.models.permissions import Permission
+    from app.models.resource import ResourceType
+    from app.models.roles import Role
+    from app.schemas.role import RoleCatalog
+
+    resource_types = [
+        ResourceType(id=i, name=f"resource{i}", created_at=NOW, updated_at=NOW)
+        for i in range(8)
+    ]
+    permissions = [
+        Permission(
+            id=i,
+            name=f"resource{i % 8}:action{i}",
+            action=f"action{i}",
+            resource_type_id=i % 8,
+            resource_type=resource_types[i % 8],
+            created_at=NOW,
+        )
+        for i in range(80)
+    ]
+    roles = []
+    for i in range(300):
+        role = Role(id=i, name=f"role{i}", created_at=NOW, company_id=1)
+        role.permissions = permissions
+        roles.append(role)
+
+    adapter = TypeAdapter(RoleCatalog)
+    catalog = adapter.validate_python(role_catalog(roles), from_attributes=True)
+    nested = listed_roles(roles)
+    normalized = json_response(adapter.dump_python(catalog, mode="json")).body
+    assert len(normalized) * 10 < len(nested)
+
+
+@pytest.mark.benchmark
+def test_list_serializer_benchmark():
+    """
+    Report CPU time per 1,000 roles and users, validated vs sent as is:
+    roles from their cached listing, users through serialize_users.
+    """
+    import time
+
+    import orjson
+
+    from app.api.serializers import json_response
+
+    roles = make_roles(1000)
+    users = make_users(1000)
+    payload = orjson.dumps(orjson.loads(listed_roles(roles)))
+
+    def cached_roles(roles):
+        return json_response(orjson.loads(payload)).body
+
+    cases = {
+        "roles": (roles, validated_roles, cached_roles),
+        "users": (users, validated_users, serialized_users),
+    }
+    iterations = 5
+    for name, (items, validated, serialized) in cases.items():
+        for label, encode in (("validated", validated), ("sent as is", serialized)):
+            encode(items)
+            start = time.process_time()
+            for _ in range(iterations):
+                encode(items)
+            elapsed = (time.process_time() - start) / iterations
+            print(f"\n1,000 {name}, {label}: {elapsed * 1e3:.1f}ms CPU")
@@ -0,0 +1,234 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from tests.conftest import login
+
+
+@pytest.mark.integration
+def test_login_evicts_oldest_sessions(client: TestClient):
+    """Test that logins beyond MAX_SESSIONS_PER_USER evict the oldest sessions."""
+    with patch("app.core.config.settings.MAX_SESSIONS_PER_USER", 2):
+        first = login(client)
+        login(client)
+        latest = login(client)
+
+    headers = {"Authorization": f"Bearer {latest['access_token']}"}
+    response = client.get("/api/v1/users/me/sessions", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+    # The evicted session can no longer be refreshed
+    response = client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.unit
+def test_session_expiry_is_capped_by_absolute_lifetime():
+    """Test that sliding expiry never passes SESSION_EXPIRE_DAYS from login."""
+    from datetime import datetime, timedelta, timezone
+
+    from app.core.config import settings
+    from app.crud.session import get_session_expiry
+
+    created_at = datetime.now(timezone.utc) - timedelta(
+        days=settings.SESSION_EXPIRE_DAYS - 1
+    )
+    assert get_session_expiry(created_at) == created_at + timedelta(
+        days=settings.SESSION_EXPIRE_DAYS
+    )
+
+    # Naive timestamps as loaded from the database are treated as UTC
+    fresh = datetime.now(timezone.utc).replace(tzinfo=None)
+    expiry = get_session_expiry(fresh)
+    assert expiry - datetime.now(timezone.utc) <= timedelta(
+        days=settings.REFRESH_TOKEN_EXPIRE_DAYS
+    )
+
+
+@pytest.mark.unit
+def test_cleanup_purges_expired_sessions_and_used_tokens(db):
+    """Test that the cleanup job removes only expired or used rows."""
+    from datetime import datetime, timedelta, timezone
+
+    from app.jobs.cleanup import run_cleanup
+    from app.models.sessions import Session as UserSession
+    from app.models.user import PasswordResetToken
+
+    now = datetime.now(timezone.utc)
+    for i in range(5):
+        db.add(
+            UserSession(
+                user_id=1,
+                refresh_token=f"expired-{i}",
+                expires_at=now - timedelta(days=1),
+            )
+        )
+    db.add(
+        UserSession(
+            user_id=1,
+            refresh_token="revoked",
+            expires_at=now + timedelta(days=1),
+            is_active=False,
+        )
+    )
+    db.add(
+        UserSession(user_id=1, refresh_token="live", expires_at=now + timedelta(days=1))
+    )
+    db.add(
+        PasswordResetToken(
+            user_id=1, token="used", expires_at=now + timedelta(hours=1), is_used=True
+        )
+    )
+    db.add(
+        PasswordResetToken(
+            user_id=1, token="pending", expires_at=now + timedelta(hours=1)
+        )
+    )
+    db.commit()
+
+    with (
+        patch("app.core.config.settings.CLEANUP_BATCH_SIZE", 2),
+        patch("app.core.config.settings.CLEANUP_THROTTLE_SECONDS", 0),
+        # A failed partition maintenance still lets the purge run
+        patch("app.jobs.cleanup.maintain_partitions", side_effect=RuntimeError),
+    ):
+        removed = run_cleanup(db)
+
+    assert removed == {
+        "sessions": 6,
+        "password_reset_tokens": 1,
+        "email_verification_tokens": 0,
+    }
+    assert [s.refresh_token for s in db.query(UserSession).all()] == ["live"]
+    assert [t.token for t in db.query(PasswordResetToken).all()] == ["pending"]
+
+
+@pytest.mark.unit
+def test_partition_month_arithmetic():
+    """Test monthly partition naming and bounds."""
+    from datetime import datetime
+
+    from app.db.partitions import add_months, partition_name, partition_start
+
+    start = datetime(2026, 11, 1)
+    assert add_months(start, 2) == datetime(2027, 1, 1)
+    assert add_months(start, -11) == datetime(2025, 12, 1)
+    assert partition_name("sessions", start) == "sessions_p202611"
+    assert partition_start("sessions", "sessions_p202611") == start
+
+
+@pytest.mark.unit
+def test_partitioned_sessions_keep_a_default_partition():
+    """Test that the DEFAULT partition is not listed and the ORM key matches."""
+    from datetime import datetime
+    from unittest.mock import MagicMock
+
+    from sqlalchemy import inspect
+
+    from app.db.partitions import list_partitions
+    from app.models.sessions import Session as UserSession
+
+    connection = MagicMock()
+    connection.execute.return_value.scalars.return_value = [
+        "sessions_default",
+        "sessions_p202611",
+    ]
+    assert list_partitions(connection, "sessions") == [
+        ("sessions_p202611", datetime(2026, 11, 1))
+    ]
+    assert [column.name for column in inspect(UserSession).primary_key] == [
+        "id",
+        "created_at",
+    ]
+
+
+@pytest.mark.integration
+def test_active_stats(client: TestClient):
+    """Test the admin dashboard statistics."""
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = client.get("/api/v1/users/active-stats", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {
+        "active_sessions_24h": 1,
+        "active_users_24h": 1,
+        "total_active_sessions": 1,
+        "total_users": 1,
+        "new_users_7d": 1,
+    }
+
+
+@pytest.mark.integration
+def test_activity_stats(client: TestClient):
+    """Test that activity stats are read from the Redis counters."""
+    from unittest.mock import MagicMock
+
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    fake_redis = MagicMock()
+    fake_redis.get.return_value = None
+    fake_redis.pipeline.return_value.execute.return_value = [
+        3,
+        5,
+        8,
+        [b"2"] + [None] * 23,
+        [None] * 23 + [b"4"],
+    ]
+    with patch("app.core.redis.redis_client", fake_redis):
+        response = client.get("/api/v1/users/activity-stats", headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["active_users_24h"] == 3
+    assert data["active_users_7d"] == 5
+    assert data["active_users_30d"] == 8
+    assert data["logins_per_hour"] == [2] + [0] * 23
+    assert data["refreshes_per_hour"] == [0] * 23 + [4]
+
+    # Global counters are read for root superusers
+    counted_keys = fake_redis.pipeline.return_value.pfcount.call_args_list[0][0]
+    assert all(key.startswith("activity:users:all:h:") for key in counted_keys)
+
+
+@pytest.mark.integration
+def test_export_users_and_active_sessions(client: TestClient):
+    """Test NDJSON and CSV exports of users and active sessions."""
+    import csv
+    import io
+    import json
+
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = client.get("/api/v1/users/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    (user,) = [json.loads(line) for line in response.text.splitlines()]
+    assert user["username"] == "root"
+    assert "hashed_password" not in user
+
+    response = client.get(
+        "/api/v1/users/export", params={"format": "csv"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    (row,) = csv.DictReader(io.StringIO(response.text))
+    assert row["username"] == "root"
+
+    login(client)
+    with patch("app.core.config.settings.EXPORT_BATCH_SIZE", 1):
+        response = client.get("/api/v1/users/active-sessions/export", headers=headers)
+    assert response.status_code == 200
+    sessions = [json.loads(line) for line in response.text.splitlines()]
+    assert len(sessions) == 2
+    assert {session["user_id"] for session in sessions} == {user["id"]}
+
+    response = client.get(
+        "/api/v1/users/export", params={"format": "xml"}, headers=headers
+    )
+    assert response.status_code == 422
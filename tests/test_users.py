@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import integration  # noqa: F401  (mapper registry)
+
+
+def _user_row(name: str, **overrides) -> dict:
+    row = {
+        "email": f"{name}@example.com",
+        "username": name,
+        "full_name": name.title(),
+        "password": "Password1!",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.integration
+def test_import_users_reports_row_errors(client: TestClient, auth_headers):
+    """Test that a bulk import creates valid rows and reports the others."""
+    rows = [
+        _user_row("alice"),
+        _user_row("bob"),
+        _user_row("root", email="someone@example.com"),
+        _user_row("carol", password="short"),
+        _user_row("alice2", email="alice@example.com"),
+        _user_row("dave", company_id=999),
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+
+    response = client.post(
+        "/api/v1/users/import",
+        files={"file": ("users.ndjson", body, "application/x-ndjson")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2
+    assert [error["row"] for error in result["errors"]] == [3, 4, 5, 6, 7]
+    assert "username already exists" in result["errors"][0]["detail"]
+    assert result["errors"][1]["detail"].startswith("password:")
+    assert result["errors"][2]["detail"] == "Duplicate of row 1 in this import"
+    assert result["errors"][3]["detail"] == "Company with id 999 not found"
+
+    response = client.get("/api/v1/users/", headers=auth_headers)
+    usernames = {user["username"] for user in response.json()}
+    assert usernames == {"root", "alice", "bob"}
+
+    # The imported password works
+    response = client.post(
+        "/api/v1/auth/login", data={"username": "alice", "password": "Password1!"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.integration
+def test_import_users_from_csv(client: TestClient, auth_headers):
+    """Test a CSV import, where empty cells fall back to defaults."""
+    body = (
+        "email,username,full_name,password,is_superuser\n"
+        "erin@example.com,erin,Erin,Password1!,\n"
+        "frank@example.com,frank,Frank,Password1!,true\n"
+    )
+    response = client.post(
+        "/api/v1/users/import",
+        params={"format": "csv"},
+        files={"file": ("users.csv", body, "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == {"created": 2, "errors": []}
+
+    response = client.get("/api/v1/users/", headers=auth_headers)
+    superusers = {user["username"]: user["is_superuser"] for user in response.json()}
+    assert superusers == {"root": True, "erin": False, "frank": True}
+
+
+@pytest.mark.integration
+def test_import_users_rejects_unreadable_files(client: TestClient, auth_headers):
+    """Test that non-UTF-8 and oversized uploads are rejected, not a 500."""
+    from unittest.mock import patch
+
+    body = "email,username,full_name,password\nzoe@example.com,zoé,Zoé,Pass1!\n"
+    response = client.post(
+        "/api/v1/users/import",
+        params={"format": "csv"},
+        files={"file": ("users.csv", body.encode("latin-1"), "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+    rows = "".join(f'{{"username": "u{n}"}}\n' for n in range(3))
+    with patch("app.crud.user.settings.IMPORT_MAX_ROWS", 2):
+        response = client.post(
+            "/api/v1/users/import",
+            files={"file": ("users.ndjson", rows, "application/x-ndjson")},
+            headers=auth_headers,
+        )
+    assert response.status_code == 413
+
+
+@pytest.mark.integration
+def test_principal_cache_stats(client: TestClient, auth_headers):
+    """Test that root superusers can read the principal cache hit ratio."""
+    from app import crud
+
+    crud.user.principal_cache_lookups.reset()
+    for _ in range(2):
+        assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
+
+    response = client.get("/api/v1/users/principal-cache-stats", headers=auth_headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert sum(stats["lookups"].values()) >= 3
+    assert 0 < stats["hit_ratio"] <= 1
+    assert stats["max_staleness_seconds"] > 0